@@ -0,0 +1,254 @@
+# answer_journal.py
+import glob
+import json
+import os
+import threading
+import time
+
+from config import (JOURNAL_FILE, JOURNAL_FSYNC_EVERY, JOURNAL_FSYNC_INTERVAL,
+                    JOURNAL_COMPACT_EVERY, JOURNAL_COMPACT_INTERVAL)
+from data_manager import apply_answer, save_users, snapshot_seq
+from metrics import STORE_SAVE, STORE_BYTES
+from user_model import User
+from user_snapshot import user_items
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process check, one process per data directory is on the operator
+    fcntl = None
+
+
+class AnswerJournal:
+    """
+    Append-only write-ahead log of user changes for the CSV store.
+    Each answer is one JSON line {"s": seq, "u": user, "w": word, "c": 0/1, "t": time}
+    and each registration {"s": seq, "u": user, "p": password, "t": time}, so a change
+    costs one small buffered append instead of rewriting users.csv. Writers never
+    fsync; UserState's flush thread calls sync() on every flush, and compact() once
+    JOURNAL_COMPACT_EVERY records or JOURNAL_COMPACT_INTERVAL seconds have piled up
+    (see user_state.py).
+
+    One process only: users live in that process's memory, which is also what
+    compact() writes back to users.csv. recover() takes an exclusive lock on
+    <path>.lock for the life of the process, so a second process (e.g. another
+    gunicorn worker) on the same data directory refuses to start instead of
+    interleaving sequence numbers and overwriting the first one's users.csv.
+    """
+
+    def __init__(self, path=JOURNAL_FILE, fsync_every=JOURNAL_FSYNC_EVERY,
+                 fsync_interval=JOURNAL_FSYNC_INTERVAL, compact_every=JOURNAL_COMPACT_EVERY,
+                 compact_interval=JOURNAL_COMPACT_INTERVAL):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self.compact_interval = compact_interval
+
+        self.seq = 0            # last sequence number written
+        self.unsynced = 0       # records written since the last fsync
+        self.since_compact = 0  # records not yet folded into the snapshot
+        self._last_sync = time.time()
+        self._last_compact = time.time()
+        self._touched = None    # users changed while compact() is copying them
+        self._lock = threading.RLock()
+        self._file = None
+        self._owner = None      # open <path>.lock, held for the life of the process
+        self._pid = None        # the process holding it
+
+    def _claim(self):
+        """Takes this data directory's journal for the current process, or raises RuntimeError."""
+        if self._pid == os.getpid():
+            return
+        if self._pid is not None:
+            # Forked after recover() (e.g. gunicorn --preload): the lock is shared, the users aren't
+            raise RuntimeError(f"{self.path} was opened by process {self._pid}; the CSV user store "
+                               f"can't be shared with forked workers. Run a single worker process.")
+        owner = open(self.path + '.lock', mode='a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(owner.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                owner.close()
+                raise RuntimeError(f"{self.path} is in use by another process. The CSV user store keeps "
+                                   f"users in one process's memory; run a single worker process.")
+        self._owner = owner
+        self._pid = os.getpid()
+
+    def recover(self, users):
+        """
+        Replays records newer than the users.csv snapshot into users (crash recovery),
+        then compacts so the journal starts empty. Returns the number of records replayed.
+        """
+        with self._lock:
+            self._claim()
+            folded = snapshot_seq()
+            self.seq = folded
+            replayed = 0
+            for record in self._read_records():
+                self.seq = max(self.seq, record['s'])
+                if record['s'] <= folded:
+                    continue
+                if 'p' in record:
+                    users.setdefault(record['u'], User(record['p']))
+                else:
+                    apply_answer(users, record['u'], record['w'], bool(record['c']))
+                replayed += 1
+            self._open()
+        if replayed:
+            print(f"📒 Replayed {replayed} journaled records.")
+            self.compact(users)
+        else:
+            # Everything on disk is already in the snapshot
+            for path, file_seq in self._rotated_files():
+                if file_seq <= folded:
+                    os.remove(path)
+        return replayed
+
+    def record_many(self, users, username, answers):
+        """
+        Applies a list of (word, is_correct) answers for one user and journals them
+        with a single buffered write. Returns the updated user.
+        """
+        with self._lock:
+            lines = []
+            user = users.get(username)
+            for word, is_correct in answers:
+                user = apply_answer(users, username, word, is_correct)
+                self.seq += 1
+                lines.append(json.dumps({'s': self.seq, 'u': username, 'w': word,
+                                         'c': 1 if is_correct else 0, 't': round(time.time(), 3)},
+                                        ensure_ascii=False))
+            self._write(lines)
+            if self._touched is not None and lines:
+                self._touched.add(username)
+            return user
+
+    def record_user(self, users, username, password):
+        """Adds a new user to users and journals the registration."""
+        with self._lock:
+            users[username] = User(password)
+            self.seq += 1
+            self._write([json.dumps({'s': self.seq, 'u': username, 'p': password,
+                                     't': round(time.time(), 3)}, ensure_ascii=False)])
+            if self._touched is not None:
+                self._touched.add(username)
+
+    def needs_sync(self):
+        """True once enough records, or enough time, have piled up since the last fsync."""
+        return self.unsynced >= self.fsync_every or (
+            self.unsynced and time.time() - self._last_sync >= self.fsync_interval)
+
+    def sync(self):
+        """Forces journaled records to disk."""
+        with self._lock:
+            if self._file and self.unsynced:
+                with STORE_SAVE.time(target='journal_fsync'):
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+            self.unsynced = 0
+            self._last_sync = time.time()
+
+    def needs_compact(self):
+        """True once enough records, or enough time, have piled up since the last snapshot."""
+        return self.since_compact >= self.compact_every or (
+            self.since_compact and time.time() - self._last_compact >= self.compact_interval)
+
+    def compact(self, users):
+        """
+        Folds the journal into a users.csv snapshot without making writers wait on it.
+        Users are copied one at a time, each copy under the lock; then the users that
+        changed during that walk are copied again and the journal switches to a fresh
+        file, together under the lock, so the copy matches exactly the records up to
+        the switch. The snapshot is written after the lock is released. Returns True
+        on success.
+        """
+        with self._lock:
+            self._claim()
+            self._touched = set()
+        snapshot = {}
+        try:
+            for username, user in user_items(users):
+                with self._lock:
+                    snapshot[username] = _copy_user(user)
+            with self._lock:
+                for username in self._touched:
+                    if username in users:
+                        snapshot[username] = _copy_user(users[username])
+                seq = self.seq
+                self.since_compact = 0
+                self._last_compact = time.time()
+                self._rotate(seq)
+        finally:
+            with self._lock:
+                self._touched = None
+        if not save_users(snapshot, journal_seq=seq):
+            return False  # rotated files are kept and replayed; the next compaction retries
+        for path, file_seq in self._rotated_files():
+            if file_seq <= seq:
+                os.remove(path)
+        return True
+
+    def close(self):
+        with self._lock:
+            self.sync()
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def _write(self, lines):
+        """Caller holds the lock."""
+        if not lines:
+            return
+        self._claim()
+        self._open()
+        text = '\n'.join(lines) + '\n'
+        self._file.write(text)
+        self.unsynced += len(lines)
+        self.since_compact += len(lines)
+        STORE_BYTES.inc(len(text.encode('utf-8')), target='journal')
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, mode='a', encoding='utf-8')
+
+    def _rotate(self, seq):
+        """Moves the current journal aside as <path>.<seq> and starts a new one. Caller holds the lock."""
+        self.sync()
+        if self._file:
+            self._file.close()
+            self._file = None
+        if os.path.exists(self.path) and os.path.getsize(self.path):
+            os.replace(self.path, f"{self.path}.{seq}")
+        self._open()
+
+    def _rotated_files(self):
+        """Returns [(path, last seq it holds)] for journals moved aside by compaction, oldest first."""
+        files = []
+        for path in glob.glob(glob.escape(self.path) + '.*'):
+            suffix = path[len(self.path) + 1:]
+            if suffix.isdigit():
+                files.append((path, int(suffix)))
+        return sorted(files, key=lambda f: f[1])
+
+    def _read_records(self):
+        for path in [p for p, _ in self._rotated_files()] + [self.path]:
+            try:
+                with open(path, mode='r', encoding='utf-8') as file:
+                    for line in file:
+                        try:
+                            record = json.loads(line)
+                            record['s'] = int(record['s'])
+                            complete = 'u' in record and ('p' in record or ('w' in record and 'c' in record))
+                        except (ValueError, KeyError, TypeError):
+                            complete = False
+                        if not complete:
+                            # A torn last line from a crash mid-write: nothing after it is usable
+                            break
+                        yield record
+            except FileNotFoundError:
+                continue
+
+
+def _copy_user(user):
+    """A plain-dict copy of a user that later answers can't change."""
+    return dict(user, incorrect_words=dict(user.get('incorrect_words') or {}))
@@ -1,44 +1,479 @@
+import asyncio
+import sqlite3
+import threading
+import time
 import requests
-from config import API_URL
+from collections import OrderedDict
+from concurrent.futures import Future
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import (API_URL, API_TIMEOUT, API_POOL_SIZE, API_RETRIES, API_BACKOFF,
+                    API_BREAKER_FAILURES, API_BREAKER_RESET, CACHE_FILE, CACHE_MEMORY_ENTRIES,
+                    CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, CACHE_TTL, CACHE_NEGATIVE_TTL,
+                    CACHE_BUSY_TIMEOUT, CACHE_FETCH_LEASE, CACHE_FETCH_POLL,
+                    OFFLINE_DICTIONARY_FILE, API_ASYNC_CONNECTIONS)
+from lookup_cache import LookupCache, MISSING
+from offline_dictionary import OfflineDictionary
+from circuit_breaker import CircuitBreaker
+from metrics import LOOKUP_LATENCY, register_collector
 
-# Simple in-memory cache (you can later switch to file-based)
-_cache = {}
+try:
+    import aiohttp
+except ImportError:  # only the async lookup path (asgi_app.py) needs it
+    aiohttp = None
+
+# Small in-memory LRU in front of the persistent cache (hot words skip SQLite)
+_cache = OrderedDict()
+_cache_lock = threading.Lock()  # guards _cache and _inflight; api_lookup runs on many threads
+
+# Single-flight: word -> Future of the lookup currently running for it
+_inflight = {}
+_coalesced = 0  # lookups that waited on another thread's fetch instead of making their own
+_shared = 0     # lookups answered by another worker process's fetch (through the shared cache file)
+
+# Async single-flight: word -> asyncio.Task of the fetch running for it, and one aiohttp session per event loop
+_inflight_async = {}
+_async_sessions = {}
+
+# Local dictionary dump (memory-mapped, read-only); None when no index has been imported
+_offline = OfflineDictionary.open(OFFLINE_DICTIONARY_FILE)
+
+# Persistent cache that survives restarts; also remembers "not found" words.
+# Shared by all worker processes on the host, which take turns fetching each word
+try:
+    _store = LookupCache(CACHE_FILE, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES,
+                         ttl=CACHE_TTL, negative_ttl=CACHE_NEGATIVE_TTL, busy_timeout=CACHE_BUSY_TIMEOUT)
+except Exception as e:
+    print(f"⚠ Could not open lookup cache '{CACHE_FILE}': {e}. Falling back to memory only.")
+    _store = None
+
+# Answers after which the API counts as failing: it is down, or throttling us
+def _api_failed(status):
+    return status >= 500 or status == 429
+
+def _make_session():
+    """Keep-alive session: connections to the API are pooled and failed GETs retried with backoff."""
+    session = requests.Session()
+    retry = Retry(total=API_RETRIES, backoff_factor=API_BACKOFF,
+                  status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset(['GET']), raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=API_POOL_SIZE, pool_maxsize=API_POOL_SIZE, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+_session = _make_session()
+
+# Fails fast (serving cached data only) after repeated API failures
+_breaker = CircuitBreaker(failure_threshold=API_BREAKER_FAILURES, reset_timeout=API_BREAKER_RESET)
+
+def client_status():
+    """Returns circuit breaker, connection pool and cache state for the dictionary API client."""
+    pools = []
+    pool_manager = _session.get_adapter(API_URL).poolmanager
+    for key in list(pool_manager.pools.keys()):
+        pool = pool_manager.pools.get(key)
+        if pool is None:
+            continue
+        pools.append({
+            'host': f"{key.key_scheme}://{key.key_host}:{key.key_port}",
+            'connections_opened': pool.num_connections,
+            'requests': pool.num_requests,
+            'idle_connections': pool.pool.qsize() if pool.pool else 0,
+        })
+    return {
+        'api_url': API_URL,
+        'breaker': _breaker.status(),
+        'pools': pools,
+        'cache': cache_stats(),
+        'offline_dictionary': {'path': _offline.path, 'entries': len(_offline)} if _offline else None,
+    }
+
+@register_collector
+def _cache_gauges():
+    stats = cache_stats()
+    return [
+        ('vocab_lookup_cache_hit_ratio', "Persistent lookup cache hit ratio (positive and negative hits).",
+         'gauge', stats.get('hit_ratio', 0.0)),
+        ('vocab_lookup_cache_entries', "Rows in the persistent lookup cache.", 'gauge', stats.get('entries', 0)),
+        ('vocab_lookup_cache_bytes', "JSON bytes in the persistent lookup cache.", 'gauge', stats.get('bytes', 0)),
+        ('vocab_lookup_memory_entries', "Entries in the in-process lookup LRU.", 'gauge', stats['memory_entries']),
+        ('vocab_lookup_coalesced_total', "Lookups that waited on another thread's fetch.", 'counter', stats['coalesced']),
+        ('vocab_lookup_shared_total', "Lookups answered by another worker process's fetch.", 'counter', stats['shared']),
+        ('vocab_api_breaker_open', "1 while the dictionary API circuit breaker is open.", 'gauge',
+         int(_breaker.status()['state'] == 'open')),
+    ]
+
+def _remember(word, entry):
+    """Puts an entry in the in-memory LRU, dropping the oldest one when full."""
+    with _cache_lock:
+        _cache[word] = entry
+        _cache.move_to_end(word)
+        while len(_cache) > CACHE_MEMORY_ENTRIES:
+            _cache.popitem(last=False)
+
+def cache_stats():
+    """Returns hit/miss counters for the persistent cache plus the in-memory size."""
+    stats = _store.stats() if _store else {}
+    stats['memory_entries'] = len(_cache)
+    stats['coalesced'] = _coalesced
+    stats['shared'] = _shared
+    stats['inflight'] = len(_inflight) + len(_inflight_async)
+    return stats
 
 def api_lookup(word):
     """
     Fetches the dictionary entry for a word from the Free Dictionary API.
-    Uses caching to avoid repeated API calls and sets a short timeout.
+    Checks the in-memory LRU, the offline dictionary, then the persistent cache,
+    and only then the network.
+    "Not found" answers are cached too, so unknown words aren't re-fetched.
+    Concurrent calls for the same word share one fetch (single-flight), across
+    threads and across worker processes using the same cache file.
     Returns the first entry data or None on failure.
     """
+    global _coalesced
     word = word.lower().strip()
     if not word:
         return None
+    start = time.perf_counter()
 
-    # ✅ Step 1: Check cache first (instant response for repeated words)
-    if word in _cache:
-        return _cache[word]
+    # ✅ Step 1: Check memory (instant response for repeated words), or join a fetch already running
+    with _cache_lock:
+        if word in _cache:
+            _cache.move_to_end(word)
+            LOOKUP_LATENCY.observe(time.perf_counter() - start, outcome='hit')
+            return _cache[word]
+        call = _inflight.get(word)
+        leader = call is None
+        if leader:
+            call = Future()
+            _inflight[word] = call
+        else:
+            _coalesced += 1
 
-    # ✅ Step 2: Fetch from API
+    if not leader:
+        result = call.result()
+        LOOKUP_LATENCY.observe(time.perf_counter() - start, outcome='coalesced')
+        return result
+
+    outcome = 'error'
     try:
-        print(f"🔍 Looking up '{word}' ...")
-        response = requests.get(API_URL + word, timeout=2)  # shorter timeout (2s)
-        response.raise_for_status()  # Raise error for 4xx/5xx
+        result, outcome = _lookup_uncached(word)
+    except BaseException as e:
+        call.set_exception(e)
+        raise
+    else:
+        call.set_result(result)
+    finally:
+        with _cache_lock:
+            _inflight.pop(word, None)
+        LOOKUP_LATENCY.observe(time.perf_counter() - start, outcome=outcome)
+    return result
 
-        data = response.json()
-        if data and isinstance(data, list):
-            _cache[word] = data[0]  # Save in cache
-            return data[0]
+def cached_lookup(word):
+    """
+    Like api_lookup but never touches the network: memory, the offline dictionary,
+    then the persistent cache (expired entries included). Returns the entry data or None.
+    """
+    word = word.lower().strip()
+    with _cache_lock:
+        if word in _cache:
+            _cache.move_to_end(word)
+            return _cache[word]
+    cached = _offline.get(word) if _offline else None
+    if cached is None:
+        cached = _stale(word)
+    if cached is not None:
+        _remember(word, cached)
+    return cached
 
-        return None
+def known_words():
+    """Words the persistent cache has entries for (the suggestion index starts from these)."""
+    return _store.words() if _store else []
+
+def not_found(word):
+    """True if the dictionary API answered "not found" for word (rather than failing to answer)."""
+    word = word.lower().strip()
+    return bool(_store) and _store.is_not_found(word)
+
+def entry_time(word):
+    """When the word's entry was fetched from the API or imported (epoch seconds), or None if unknown."""
+    word = word.lower().strip()
+    if _offline and word in _offline:
+        return _offline.mtime
+    return _store.stored_at(word) if _store else None
+
+def _lookup_uncached(word):
+    """
+    Offline dictionary, persistent cache, then the network. Only one thread runs this
+    per word at a time. Returns (entry or None, outcome label for the lookup latency metric).
+    """
+    local = _lookup_local(word)
+    if local:
+        return local
+
+    # ✅ Step 2: Another worker process already fetching it? Wait for its result
+    # (before asking the breaker, so waiting never holds its half-open trial)
+    if _store and not _claim(word):
+        shared = _wait_shared(word)
+        if shared:
+            return shared
+
+    try:
+        # ✅ Step 3: API known to be down? Fail fast with whatever the cache still has
+        if not _breaker.allow():
+            return _stale(word), 'breaker_open'
+
+        # ✅ Step 4: Fetch from API
+        try:
+            return _fetch(word)
+        except BaseException:
+            _breaker.release()  # _fetch records the outcome of every answer or error it handles
+            raise
+    finally:
+        if _store:
+            _release(word)
+
+def _claim(word):
+    """
+    Claims word for fetching here: False if another worker process is already
+    fetching it. If the cache can't record the claim (e.g. "database is locked"
+    after CACHE_BUSY_TIMEOUT), the word is fetched here unclaimed.
+    """
+    try:
+        return _store.claim(word, CACHE_FETCH_LEASE)
+    except sqlite3.Error as e:
+        print(f"⚠ Could not claim '{word}' in the lookup cache: {e}")
+        return True
+
+def _release(word):
+    """Drops this process's claim on word; one that can't be dropped expires after CACHE_FETCH_LEASE."""
+    try:
+        _store.release(word)
+    except sqlite3.Error as e:
+        print(f"⚠ Could not release '{word}' in the lookup cache: {e}")
+
+def _fetch(word):
+    """GET the word from the API and cache the answer. Returns (entry or None, outcome)."""
+    response = None
+    try:
+        print(f"🔍 Looking up '{word}' ...")
+        response = _session.get(API_URL + word, timeout=API_TIMEOUT)
+        if response.status_code != 404:
+            response.raise_for_status()  # Raise error for 4xx/5xx
+        _breaker.record_success()  # the API answered, even if the word doesn't exist
+
+        data = response.json() if response.status_code != 404 else None
+        return _save_fetched(word, data)
 
     except requests.exceptions.Timeout:
         print("⏱️ Request timed out. The API took too long to respond.")
-        return None
+        _breaker.record_failure()
+        return _stale(word), 'error'
     except requests.exceptions.HTTPError as e:
-        if response.status_code == 404:
-            return None  # word not found
         print(f"❌ HTTP error fetching '{word}': {e}")
-        return None
-    except requests.exceptions.RequestException as e:
+        if response is not None and _api_failed(response.status_code):
+            _breaker.record_failure()
+        else:
+            _breaker.record_success()
+        return _stale(word), 'error'
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"🌐 Network error fetching '{word}': {e}")
+        _breaker.record_failure()
+        return _stale(word), 'error'
+
+def _lookup_local(word):
+    """Offline dictionary, then the persistent cache. Returns (entry or None, outcome), or None if neither knows the word."""
+    if _offline:
+        entry = _offline.get(word)
+        if entry is not None:
+            _remember(word, entry)
+            return entry, 'offline'
+    if _store:
+        try:
+            cached = _store.get(word)
+        except sqlite3.Error as e:
+            print(f"⚠ Could not read '{word}' from the lookup cache: {e}")
+            cached = MISSING
+        if cached is not MISSING:
+            if cached is not None:
+                _remember(word, cached)
+            return cached, 'hit'
+    return None
+
+def _save_fetched(word, data):
+    """Caches an API answer, including "not found" (data None/empty). Returns (entry or None, outcome)."""
+    entry = data[0] if data and isinstance(data, list) else None
+    if entry is not None:
+        _remember(word, entry)  # Save in cache
+    if _store:
+        try:
+            _store.put(word, entry)
+        except sqlite3.Error as e:
+            print(f"⚠ Could not save '{word}' to the lookup cache: {e}")
+    return entry, 'miss' if entry is not None else 'not_found'
+
+def _shared_result(word):
+    """
+    Checks once on another process's fetch of word: (entry, 'shared') once it is
+    stored, None if that fetch ended without storing anything, else MISSING.
+    """
+    global _shared
+    try:
+        entry, claimed = _store.poll(word)
+    except sqlite3.Error:
+        return None  # fetch it here rather than wait on a cache we can't read
+    if entry is not MISSING:
+        _shared += 1
+        if entry is not None:
+            _remember(word, entry)
+        return entry, 'shared'
+    return MISSING if claimed else None
+
+def _wait_shared(word):
+    """Waits (up to the claim lease) for another process's fetch. Returns (entry, 'shared') or None to fetch it here."""
+    deadline = time.monotonic() + CACHE_FETCH_LEASE
+    while time.monotonic() < deadline:
+        time.sleep(CACHE_FETCH_POLL)
+        result = _shared_result(word)
+        if result is not MISSING:
+            return result
+    return None
+
+def _stale(word):
+    """Expired cache data is better than nothing while the API is unreachable."""
+    if not _store:
+        return None
+    try:
+        cached = _store.get(word, allow_stale=True)
+    except sqlite3.Error:
+        return None
+    return None if cached is MISSING else cached
+
+# --- Async lookups (ASGI app) ---
+async def api_lookup_async(word):
+    """
+    api_lookup for asyncio code: the same caches, breaker and metrics, but the API
+    call goes through aiohttp, so a slow lookup holds no thread. Concurrent calls
+    for a word share one fetch task, which runs to completion (filling the cache)
+    even if every caller is cancelled, e.g. by a quiz deadline.
+    """
+    global _coalesced
+    word = word.lower().strip()
+    if not word:
         return None
+    start = time.perf_counter()
+
+    with _cache_lock:
+        if word in _cache:
+            _cache.move_to_end(word)
+            LOOKUP_LATENCY.observe(time.perf_counter() - start, outcome='hit')
+            return _cache[word]
+
+    loop = asyncio.get_running_loop()
+    fetch = _inflight_async.get(word)
+    coalesced = fetch is not None and fetch.get_loop() is loop
+    if coalesced:
+        _coalesced += 1
+    else:
+        fetch = loop.create_task(_lookup_uncached_async(word))
+        _inflight_async[word] = fetch
+        fetch.add_done_callback(lambda task: _inflight_async.pop(word, None)
+                                if _inflight_async.get(word) is task else None)
+
+    result, outcome = await asyncio.shield(fetch)
+    LOOKUP_LATENCY.observe(time.perf_counter() - start, outcome='coalesced' if coalesced else outcome)
+    return result
+
+async def _lookup_uncached_async(word):
+    """
+    Async _lookup_uncached. The cache store is SQLite, which can block on disk or on
+    other processes' locks, so every call into it runs on a worker thread.
+    """
+    local = await asyncio.to_thread(_lookup_local, word)
+    if local:
+        return local
+
+    if _store and not await asyncio.to_thread(_claim, word):
+        shared = await _wait_shared_async(word)
+        if shared:
+            return shared
+
+    try:
+        if not _breaker.allow():
+            return await asyncio.to_thread(_stale, word), 'breaker_open'
+        try:
+            return await _fetch_async(word)
+        except BaseException:
+            _breaker.release()  # e.g. aiohttp missing, or the task cancelled at shutdown
+            raise
+    finally:
+        if _store:
+            await asyncio.to_thread(_release, word)
+
+async def _wait_shared_async(word):
+    """_wait_shared without blocking the event loop between checks."""
+    deadline = time.monotonic() + CACHE_FETCH_LEASE
+    while time.monotonic() < deadline:
+        await asyncio.sleep(CACHE_FETCH_POLL)
+        result = await asyncio.to_thread(_shared_result, word)
+        if result is not MISSING:
+            return result
+    return None
+
+async def _fetch_async(word):
+    """Async _fetch, through aiohttp with the same retries and backoff as the requests session."""
+    session = _async_session()  # outside the try: its except clauses need aiohttp
+    try:
+        print(f"🔍 Looking up '{word}' ...")
+        for attempt in range(API_RETRIES + 1):
+            retry = attempt < API_RETRIES
+            try:
+                async with session.get(API_URL + word) as response:
+                    if retry and response.status in (429, 500, 502, 503, 504):
+                        await asyncio.sleep(API_BACKOFF * 2 ** attempt)
+                        continue
+                    if response.status != 404:
+                        response.raise_for_status()  # Raise error for 4xx/5xx
+                    data = await response.json(content_type=None) if response.status != 404 else None
+                break
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if not retry:
+                    raise
+                await asyncio.sleep(API_BACKOFF * 2 ** attempt)
+        _breaker.record_success()
+        return await asyncio.to_thread(_save_fetched, word, data)
+
+    except asyncio.TimeoutError:
+        print("⏱️ Request timed out. The API took too long to respond.")
+        _breaker.record_failure()
+        return await asyncio.to_thread(_stale, word), 'error'
+    except aiohttp.ClientResponseError as e:
+        print(f"❌ HTTP error fetching '{word}': {e}")
+        if _api_failed(e.status):
+            _breaker.record_failure()
+        else:
+            _breaker.record_success()
+        return await asyncio.to_thread(_stale, word), 'error'
+    except (aiohttp.ClientError, ValueError) as e:
+        print(f"🌐 Network error fetching '{word}': {e}")
+        _breaker.record_failure()
+        return await asyncio.to_thread(_stale, word), 'error'
+
+def _async_session():
+    """One aiohttp session (and connection pool) per event loop."""
+    if aiohttp is None:
+        raise RuntimeError("Async lookups need aiohttp (pip install aiohttp).")
+    loop = asyncio.get_running_loop()
+    session = _async_sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(limit=API_ASYNC_CONNECTIONS, limit_per_host=API_ASYNC_CONNECTIONS)
+        session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=API_TIMEOUT))
+        _async_sessions[loop] = session
+    return session
+
+async def close_async_session():
+    """Closes the current event loop's aiohttp session (call on ASGI shutdown)."""
+    session = _async_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
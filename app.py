@@ -1,15 +1,69 @@
 # app.py
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
-from data_manager import save_users, load_users
-from config import QUIZ_OPTIONS
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response, stream_with_context, g
+from config import (QUIZ_OPTIONS, QUESTION_BANK_WARM_ON_START, LEADERBOARD_PAGE_SIZE, QUIZ_STREAMING,
+                    LOOKUP_HTTP_MAX_AGE, SUGGEST_LIMIT, DIFFICULTY_TOP_K)
 from vocabulary_bot import VocabularyBot
+from question_bank import start_warmer
+from api_client import client_status
+import metrics
 import json
 import time
+from datetime import datetime, timezone
 
 app = Flask(__name__)
 app.secret_key = "supersecretkey"  # Required for sessions
 
 bot = VocabularyBot()  # Initialize VocabularyBot
+if QUESTION_BANK_WARM_ON_START:
+    start_warmer(bot.bank)  # Look up unbanked words in the background
+
+# --- Responses shared with asgi_app.py ---
+def quiz_page(username, quiz_data, stream_num, review):
+    """Template values for quiz.html."""
+    return {
+        'current_user': username,
+        'user_score': bot.users.get(username, {}).get('score', 0),
+        'quiz': quiz_data,
+        'stream_num': stream_num,
+        'review': review,
+        'QUIZ_OPTIONS': QUIZ_OPTIONS,
+    }
+
+def lookup_not_found(word):
+    """The 404 body for a failed lookup, with spelling suggestions (CPU-bound; may wait for the index to build)."""
+    return {'error': 'Word not found or network error.',
+            'suggestions': bot.suggestions.correct(word, SUGGEST_LIMIT)}
+
+def lookup_summary(word, result):
+    """The /lookup POST answer: the meaning plus a few synonyms and antonyms."""
+    return {
+        'word': word,
+        'meaning': result.meaning,
+        'synonyms': ', '.join(result.synonyms[:10]) or "None",
+        'antonyms': ', '.join(result.antonyms[:10]) or "None"
+    }
+
+def cache_lookup(response, result):
+    """Marks a found /api/lookup/<word> response public, with its ETag and Last-Modified."""
+    response.set_etag(result.etag)
+    response.last_modified = datetime.fromtimestamp(int(result.fetched_at), tz=timezone.utc)
+    response.cache_control.public = True
+    response.cache_control.max_age = LOOKUP_HTTP_MAX_AGE
+    return response
+
+# --- Request Latency Metrics ---
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def _record_latency(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.HTTP_LATENCY.observe(time.perf_counter() - start, route=route,
+                                     method=request.method, status=response.status_code)
+    return response
 
 # --- Home / Index ---
 @app.route('/')
@@ -41,8 +95,9 @@ def register():
             flash("Passwords do not match.", "error")
             return redirect(url_for('register'))
 
-        bot.users[username] = {'password': password, 'score': 0, 'incorrect_words': {}}
-        save_users(bot.users)
+        if not bot.add_user(username, password):
+            flash("Username already exists.", "error")
+            return redirect(url_for('register'))
         session['username'] = username
         flash(f"Welcome, {username}! Your account has been created.", "success")
         return redirect(url_for('index'))
@@ -79,7 +134,8 @@ def logout():
 def choose_quiz():
     if 'username' not in session:
         return redirect(url_for('login'))
-    return render_template('choose_quiz.html', QUIZ_OPTIONS=QUIZ_OPTIONS)
+    due = bot.reviews.due_count(session['username'])
+    return render_template('choose_quiz.html', QUIZ_OPTIONS=QUIZ_OPTIONS, review_due=due)
 
 # --- Quiz Page ---
 @app.route('/quiz')
@@ -88,22 +144,37 @@ def quiz():
         return redirect(url_for('login'))
 
     username = session['username']
-    user_score = bot.users.get(username, {}).get('score', 0)
-
     num_questions = request.args.get('num', type=int)
+    review = request.args.get('mode') == 'review'
     quiz_data = []
-    start_time = time.time()
-    if num_questions:
+    stream_num = 0
+    if num_questions and review:
+        # Built from the bank/cache, so there's nothing worth streaming
+        quiz_data = bot.create_review_quiz(username, num_questions)
+    elif num_questions and QUIZ_STREAMING:
+        # Render right away; quiz.js pulls questions from /quiz/stream as they are built
+        stream_num = num_questions
+    elif num_questions:
         quiz_data = bot.create_quiz(num_questions)
-    print(time.time()-start_time, "=======time")
 
-    return render_template(
-        'quiz.html',
-        current_user=username,
-        user_score=user_score,
-        quiz=quiz_data,
-        QUIZ_OPTIONS=QUIZ_OPTIONS
-    )
+    return render_template('quiz.html', **quiz_page(username, quiz_data, stream_num, review))
+
+# --- Quiz Question Stream (Server-Sent Events) ---
+@app.route('/quiz/stream')
+def quiz_stream():
+    if 'username' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    num_questions = request.args.get('num', 0, type=int)
+
+    def events():
+        # One "question" event per question as soon as it's built, then "done"
+        for question in bot.iter_quiz(num_questions):
+            yield f"event: question\ndata: {json.dumps(question)}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 # --- Submit Quiz Answer ---
 @app.route('/quiz/submit', methods=['POST'])
@@ -116,44 +187,47 @@ def submit_quiz():
     is_correct = data.get('correct', False)
     username = session['username']
 
-    print(f"DEBUG: Received submit for '{word}' (correct={is_correct}) from {username}")
+    # Update score and wrong words in memory; the flush thread persists them
+    user = bot.record_answer(username, word, is_correct)
 
-    # Load users from file (ensures we’re using latest data)
-    users = load_users()
-
-    # Ensure the current user exists in file data
-    user = users.get(username)
-    if not user:
-        print("DEBUG: user not found in users.csv, creating new entry")
-        user = {'password': 'unknown', 'score': 0, 'incorrect_words': {}}
-
-    if 'incorrect_words' not in user:
-        user['incorrect_words'] = {}
+    return jsonify({
+        'success': True,
+        'score': user['score'],
+        'incorrect_words': dict(user['incorrect_words'])
+    })
 
-    # --- Update score and track wrong words ---
-    if is_correct:
-        user['score'] += 5
-        if word in user['incorrect_words']:
-            user['incorrect_words'][word] -= 1
-            if user['incorrect_words'][word] <= 0:
-                del user['incorrect_words'][word]
-    else:
-        user['score'] -= 1
-        user['incorrect_words'][word] = user['incorrect_words'].get(word, 0) + 1
+# --- Submit Several Answers At Once ---
+@app.route('/quiz/submit_batch', methods=['POST'])
+def submit_quiz_batch():
+    """
+    Body: {"attempt_id": str, "answers": [{"index": int, "word": str, "correct": bool}, ...]}
+    Answers are applied together in memory; an (attempt_id, index) pair is only ever counted once,
+    so the client can safely resend a batch after a network error.
+    """
+    if 'username' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
 
-    # --- Update user data ---
-    users[username] = user
+    data = request.get_json(force=True, silent=True) or {}
+    attempt_id = str(data.get('attempt_id', '')).strip()
+    raw_answers = data.get('answers')
+    if not attempt_id or not isinstance(raw_answers, list):
+        return jsonify({'error': 'attempt_id and answers are required.'}), 400
 
-    # --- Save to users.csv ---
-    save_users(users)
-    bot.users = users  # ✅ keep VocabularyBot memory synced
+    try:
+        answers = [(int(a['index']), str(a['word']).strip().lower(), bool(a.get('correct', False)))
+                   for a in raw_answers]
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Each answer needs an index and a word.'}), 400
 
-    print("DEBUG: Saved users.csv successfully for", username)
+    username = session['username']
+    user, applied = bot.record_answers(username, answers, attempt_id=attempt_id)
+    user = user or bot.users.get(username, {})
 
     return jsonify({
         'success': True,
-        'score': user['score'],
-        'incorrect_words': user['incorrect_words']
+        'applied': applied,
+        'score': user.get('score', 0),
+        'incorrect_words': dict(user.get('incorrect_words', {}))
     })
 
 # --- Lookup Word ---
@@ -170,29 +244,42 @@ def lookup():
         if not word:
             return jsonify({'error': 'No word provided.'}), 400
 
-        data = bot.display_lookup_menu(word)
-        if not data:
-            return jsonify({'error': 'Word not found or network error.'}), 404
-
-        # Extract meaning, synonyms, antonyms
-        lines = data.split('\n')
-        meaning_lines = [l for l in lines if not l.startswith("Synonyms:") and not l.startswith("Antonyms:")]
-        meaning = "\n".join(meaning_lines).strip()
+        result = bot.lookup(word)
+        if not result:
+            return jsonify(lookup_not_found(word)), 404
 
-        synonyms_line = next((l for l in lines if l.startswith("Synonyms:")), "Synonyms: None")
-        antonyms_line = next((l for l in lines if l.startswith("Antonyms:")), "Antonyms: None")
+        return jsonify(lookup_summary(word, result))
 
-        synonyms = synonyms_line.replace("Synonyms:", "").strip()
-        antonyms = antonyms_line.replace("Antonyms:", "").strip()
+    return render_template('lookup.html', current_user=username, user_score=user_score)
 
-        return jsonify({
-            'word': word,
-            'meaning': meaning,
-            'synonyms': synonyms,
-            'antonyms': antonyms
-        })
+# --- Lookup API (cacheable) ---
+@app.route('/api/lookup/<word>')
+def api_lookup_word(word):
+    """
+    Structured lookup as JSON. Dictionary data is the same for every user, so the
+    response is public and carries an ETag, Last-Modified and Cache-Control:
+    browsers and proxies can reuse it, and revalidations get a bodiless 304.
+    """
+    result = bot.lookup(word)
+    if not result:
+        response = jsonify(lookup_not_found(word))
+        response.status_code = 404
+        response.cache_control.no_store = True
+        return response
+
+    response = cache_lookup(jsonify(result.to_dict()), result)
+    return response.make_conditional(request)
+
+# --- Lookup Suggestions ---
+@app.route('/lookup/suggest')
+def lookup_suggest():
+    """Completions and typo corrections for the lookup box, from local words only (no API call)."""
+    if 'username' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
 
-    return render_template('lookup.html', current_user=username, user_score=user_score)
+    query = request.args.get('q', '')
+    limit = max(1, min(request.args.get('limit', SUGGEST_LIMIT, type=int), SUGGEST_LIMIT))
+    return jsonify(bot.suggestions.suggest(query, limit))
 
 # --- Feedback ---
 @app.route("/feedback")
@@ -201,12 +288,12 @@ def feedback():
         return redirect(url_for("login"))
 
     username = session["username"]
-    users = load_users()  # Load fresh data from users.csv
-    user_data = users.get(username, {})
+    user_data = bot.users.get(username, {})  # In-memory state is authoritative (see user_state.py)
     wrong_words = user_data.get("incorrect_words", {})
 
     sorted_words = sorted(wrong_words.items(), key=lambda x: x[1], reverse=True)
-    return render_template("feedback.html", username=username, wrong_words=sorted_words)
+    hardest = bot.difficulty.hardest(DIFFICULTY_TOP_K, words=bot.common_words)
+    return render_template("feedback.html", username=username, wrong_words=sorted_words, hardest=hardest)
 
 # --- Leaderboard ---
 @app.route('/leaderboard')
@@ -215,8 +302,42 @@ def leaderboard():
         return redirect(url_for('login'))
 
     username = session['username']
-    ranks = sorted(((u, d['score']) for u, d in bot.users.items()), key=lambda x: x[1], reverse=True)
-    return render_template('leaderboard.html', current_user=username, leaderboard=ranks)
+    page = max(request.args.get('page', 1, type=int), 1)
+    total_pages = max((len(bot.leaderboard) + LEADERBOARD_PAGE_SIZE - 1) // LEADERBOARD_PAGE_SIZE, 1)
+    ranks = bot.leaderboard.top(LEADERBOARD_PAGE_SIZE, offset=(page - 1) * LEADERBOARD_PAGE_SIZE)
+
+    # "Your rank" strip, shown only when the current user isn't on this page
+    neighbours = []
+    if not any(u == username for _, u, _ in ranks):
+        neighbours = bot.leaderboard.around(username, radius=2)
+
+    return render_template('leaderboard.html', current_user=username, leaderboard=ranks,
+                           neighbours=neighbours, page=page, total_pages=total_pages)
+
+# --- Global Word Difficulty ---
+@app.route('/api/difficulty')
+def api_difficulty():
+    """
+    Which quiz words are hardest across all users, as JSON: the top k (default
+    DIFFICULTY_TOP_K) by share of users missing them, and miss-rate percentiles.
+    ?words=a,b,c returns those words' miss rates instead.
+    """
+    words = request.args.get('words')
+    if words:
+        return jsonify(bot.difficulty.miss_rates(w.strip().lower() for w in words.split(',') if w.strip()))
+    k = max(1, min(request.args.get('k', DIFFICULTY_TOP_K, type=int), 1000))
+    return jsonify(bot.difficulty.stats(words=bot.common_words, k=k))
+
+# --- Metrics (Prometheus text format) ---
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# --- Dictionary API Client Status ---
+@app.route('/api/status')
+def api_status():
+    """Circuit breaker, connection pool and lookup cache state, plus quiz word usability, as JSON."""
+    return jsonify({**client_status(), 'quiz_words': bot.quiz_words.stats()})
 
 # --- Run App ---
 if __name__ == '__main__':
@@ -0,0 +1,149 @@
+# asgi_app.py
+"""
+ASGI entry point. The routes that wait on the dictionary API (/lookup,
+/api/lookup/<word>, /quiz and /quiz/stream) run as async Quart handlers, so a
+slow lookup parks a coroutine instead of a worker thread; every other route is
+the Flask app from app.py, sharing its bot, templates and session cookie.
+
+    hypercorn asgi_app:app        (or: uvicorn asgi_app:app)
+
+Needs quart, aiohttp and asgiref on top of the Flask app's requirements.
+"""
+import asyncio
+import json
+import time
+
+from asgiref.wsgi import WsgiToAsgi
+from quart import Quart, render_template, request, redirect, url_for, session, jsonify, Response, g
+
+import app as wsgi
+from api_client import close_async_session
+from config import QUIZ_STREAMING
+import metrics
+
+bot = wsgi.bot
+quart_app = Quart(__name__)
+quart_app.secret_key = wsgi.app.secret_key  # same signed cookie, so logins carry over between the two apps
+
+_flask_app = WsgiToAsgi(wsgi.app)
+ASYNC_PATHS = ('/lookup', '/quiz', '/quiz/stream')
+
+
+async def app(scope, receive, send):
+    """Sends the async routes (and lifespan events) to Quart, everything else to Flask."""
+    path = scope.get('path', '')
+    if scope['type'] == 'lifespan' or path in ASYNC_PATHS or path.startswith('/api/lookup/'):
+        await quart_app(scope, receive, send)
+    else:
+        await _flask_app(scope, receive, send)
+
+
+def _flask_url(error, endpoint, values):
+    """Templates link to Flask-only pages (index, login, ...); build those from Flask's URL map."""
+    return wsgi.app.url_map.bind('').build(endpoint, values)
+
+
+quart_app.url_build_error_handlers.append(_flask_url)
+
+
+@quart_app.after_serving
+async def _close_session():
+    await close_async_session()
+
+
+# --- Request Latency Metrics ---
+@quart_app.before_request
+async def _start_timer():
+    g.request_start = time.perf_counter()
+
+
+@quart_app.after_request
+async def _record_latency(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.HTTP_LATENCY.observe(time.perf_counter() - start, route=route,
+                                     method=request.method, status=response.status_code)
+    return response
+
+
+# --- Quiz Page ---
+@quart_app.route('/quiz')
+async def quiz():
+    if 'username' not in session:
+        return redirect(url_for('login'))
+
+    username = session['username']
+    num_questions = request.args.get('num', type=int)
+    review = request.args.get('mode') == 'review'
+    quiz_data = []
+    stream_num = 0
+    if num_questions and review:
+        # Words in neither the bank nor the cache are looked up on a thread pool (up to the
+        # quiz deadline), so the whole quiz is built on a worker thread
+        quiz_data = await asyncio.to_thread(bot.create_review_quiz, username, num_questions)
+    elif num_questions and QUIZ_STREAMING:
+        stream_num = num_questions
+    elif num_questions:
+        quiz_data = await bot.create_quiz_async(num_questions)
+
+    return await render_template('quiz.html', **wsgi.quiz_page(username, quiz_data, stream_num, review))
+
+
+# --- Quiz Question Stream (Server-Sent Events) ---
+@quart_app.route('/quiz/stream')
+async def quiz_stream():
+    if 'username' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    num_questions = request.args.get('num', 0, type=int)
+
+    async def events():
+        async for question in bot.iter_quiz_async(num_questions):
+            yield f"event: question\ndata: {json.dumps(question)}\n\n".encode('utf-8')
+        yield b"event: done\ndata: {}\n\n"
+
+    response = Response(events(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.timeout = None  # the stream lasts as long as the quiz deadline, not a request timeout
+    return response
+
+
+# --- Lookup Word ---
+@quart_app.route('/lookup', methods=['GET', 'POST'])
+async def lookup():
+    if 'username' not in session:
+        return redirect(url_for('login'))
+
+    username = session['username']
+    user_score = bot.users.get(username, {}).get('score', 0)
+
+    if request.method == 'POST':
+        data = await request.get_json(force=True, silent=True) or {}
+        word = str(data.get('word', '')).strip()
+        if not word:
+            return jsonify({'error': 'No word provided.'}), 400
+
+        result = await bot.lookup_async(word)
+        if not result:
+            return jsonify(await asyncio.to_thread(wsgi.lookup_not_found, word)), 404
+
+        return jsonify(wsgi.lookup_summary(word, result))
+
+    return await render_template('lookup.html', current_user=username, user_score=user_score)
+
+
+# --- Lookup API (cacheable) ---
+@quart_app.route('/api/lookup/<word>')
+async def api_lookup_word(word):
+    """Async twin of app.api_lookup_word: same JSON, ETag, Last-Modified and Cache-Control."""
+    result = await bot.lookup_async(word)
+    if not result:
+        response = jsonify(await asyncio.to_thread(wsgi.lookup_not_found, word))
+        response.status_code = 404
+        response.cache_control.no_store = True
+        return response
+
+    response = wsgi.cache_lookup(jsonify(result.to_dict()), result)
+    await response.make_conditional(request)
+    return response
@@ -0,0 +1,137 @@
+# benchmarks/fake_dictionary.py
+"""
+Local stand-in for the Free Dictionary API, for benchmarks and load tests.
+Answers GET <prefix>/<word> with a deterministic entry in the same shape the real
+API returns, after an optional delay, and can inject 5xx errors and 404s, either
+at random rates or scripted for the next requests (fail_next, used by the tests).
+
+    python benchmarks/fake_dictionary.py --port 8765 --latency 0.05 --error-rate 0.01
+    VOCAB_API_URL=http://127.0.0.1:8765/api/v2/entries/en/ python app.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Pool the fake synonyms/antonyms are drawn from
+RELATED_WORDS = [f"related{i}" for i in range(5000)]
+
+
+def make_entry(word, empty_rate=0.1):
+    """Deterministic dictionary entry for word; about empty_rate of words get no synonyms/antonyms."""
+    rng = random.Random(word)
+    if rng.random() < empty_rate:
+        synonyms, antonyms = [], []
+    else:
+        synonyms = rng.sample(RELATED_WORDS, rng.randint(1, 6))
+        antonyms = rng.sample(RELATED_WORDS, rng.randint(0, 4))
+    return {
+        'word': word,
+        'phonetics': [],
+        'meanings': [{
+            'partOfSpeech': rng.choice(['noun', 'verb', 'adjective']),
+            'definitions': [{'definition': f"Synthetic definition of {word}.", 'synonyms': [], 'antonyms': []}],
+            'synonyms': synonyms,
+            'antonyms': antonyms,
+        }],
+    }
+
+
+class FakeDictionary:
+    """Threaded HTTP server serving make_entry() results with configurable latency and failures."""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, not_found_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.not_found_rate = not_found_rate
+        self.requests = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._scripted = deque()  # statuses to answer the next requests with, before the rates apply
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/v2/entries/en/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-dictionary', daemon=True)
+        self._thread.start()
+        return self.url
+
+    def fail_next(self, *statuses):
+        """Answers the next len(statuses) requests with these statuses (e.g. 429, 503), in order."""
+        with self._lock:
+            self._scripted.extend(statuses)
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+            def do_GET(self):
+                word = self.path.rstrip('/').rsplit('/', 1)[-1].lower()
+                with fake._lock:
+                    fake.requests += 1
+                    scripted = fake._scripted.popleft() if fake._scripted else None
+                    roll = fake._rng.random()
+                    delay = fake.latency + fake._rng.random() * fake.jitter
+                time.sleep(delay)
+
+                if scripted is not None:
+                    with fake._lock:
+                        fake.errors += 1
+                    self._send(scripted, {'title': 'Scripted failure'})
+                elif roll < fake.error_rate:
+                    with fake._lock:
+                        fake.errors += 1
+                    self._send(503, {'title': 'Service Unavailable'})
+                elif roll < fake.error_rate + fake.not_found_rate or word.startswith('missing'):
+                    self._send(404, {'title': 'No Definitions Found'})
+                else:
+                    self._send(200, [make_entry(word)])
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run a local fake dictionary API.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random delay, up to this many seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument('--not-found-rate', type=float, default=0.0, help="fraction of requests answered with 404")
+    args = parser.parse_args()
+
+    server = FakeDictionary(port=args.port, latency=args.latency, jitter=args.jitter,
+                            error_rate=args.error_rate, not_found_rate=args.not_found_rate)
+    print(f"Fake dictionary listening on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,67 @@
+# benchmarks/generate.py
+"""
+Synthetic words.csv / users.csv generators for benchmarks and load tests.
+
+    python benchmarks/generate.py --words 5000 --users 100000 --out /tmp/bench
+"""
+import argparse
+import csv
+import json
+import os
+import random
+
+
+def make_words(count, seed=0):
+    """Returns count distinct lowercase pseudo-words."""
+    rng = random.Random(seed)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    words = set()
+    while len(words) < count:
+        words.add(''.join(rng.choice(letters) for _ in range(rng.randint(4, 10))))
+    return sorted(words)
+
+
+def make_users(count, words, max_missed=20, seed=0):
+    """Returns a users dict in data_manager's shape with random scores and missed words."""
+    rng = random.Random(seed)
+    users = {}
+    for i in range(count):
+        missed = rng.sample(words, min(rng.randint(0, max_missed), len(words)))
+        users[f"user{i}"] = {
+            'password': f"pw{i}",
+            'score': rng.randint(-50, 2000),
+            'incorrect_words': {w: rng.randint(1, 5) for w in missed},
+        }
+    return users
+
+
+def write_words_csv(path, words):
+    with open(path, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['word'])
+        writer.writerows([w] for w in words)
+
+
+def write_users_csv(path, users):
+    """Same layout as data_manager.save_users_csv."""
+    with open(path, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['username', 'password', 'score', 'incorrect_words_json'])
+        for username, data in users.items():
+            writer.writerow([username, data['password'], data['score'],
+                             json.dumps(data['incorrect_words'], ensure_ascii=False)])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate synthetic words.csv and users.csv files.")
+    parser.add_argument('--words', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='.', help="directory to write words.csv and users.csv into")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    words = make_words(args.words, seed=args.seed)
+    write_words_csv(os.path.join(args.out, 'words.csv'), words)
+    write_users_csv(os.path.join(args.out, 'users.csv'), make_users(args.users, words, seed=args.seed))
+    print(f"Wrote {args.words} words and {args.users} users to {args.out}")
@@ -0,0 +1,383 @@
+# benchmarks/loadtest.py
+"""
+Load test: N virtual users running full quiz sessions against the web app at once.
+
+By default the Flask app runs as a child process in a scratch directory (its own
+users.csv, caches and journal) and looks words up on the local fake dictionary,
+whose latency and error rates are configurable, so the real data and the network
+are never touched. Results are printed and written as JSON, like run.py.
+
+    python benchmarks/loadtest.py --users 50 --sessions 3
+    python benchmarks/loadtest.py --users 200 --latency 0.1 --error-rate 0.05 --submit batch
+    python benchmarks/loadtest.py --server-cmd "gunicorn -w 1 --threads 16 -b 127.0.0.1:{port} app:app"
+
+The app keeps users in one process's memory, so a --server-cmd must run a single
+worker process (threads are fine); with the CSV store extra workers refuse to start.
+
+Each virtual user registers a fresh account, then for every session logs in, opens
+/quiz and reads its questions (over /quiz/stream when streaming is on), answers
+them through /quiz/submit (or /quiz/submit_batch, five at a time like quiz.js),
+looks a word up and opens /leaderboard.
+
+A virtual user knows exactly what its score should be, so lost score updates show
+up two ways: a submit response carrying the wrong running score (lost in memory),
+and, once the server has been stopped and has flushed, the saved users disagreeing
+with the total (lost by concurrent writes to the store).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import shlex
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(HERE)
+sys.path.insert(0, REPO_ROOT)
+
+from fake_dictionary import FakeDictionary
+from generate import make_words, make_users, write_words_csv, write_users_csv
+
+PASSWORD = 'loadtest'
+BATCH_SIZE = 5                 # answers per /quiz/submit_batch call, as in static/quiz.js
+CORRECT_POINTS, WRONG_POINTS = 5, -1   # data_manager.apply_answer
+QUESTIONS_RE = re.compile(r'let questions = (.*?);\s*$', re.MULTILINE)
+STREAM_RE = re.compile(r'const streamNum = (\d+);')
+
+
+def percentile(times, q):
+    """times must be sorted."""
+    return times[min(int(len(times) * q), len(times) - 1)]
+
+
+class Recorder:
+    """Latency samples and outcomes per route, shared by all virtual users."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.times = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))   # route -> status or exception -> count
+
+    def record(self, route, seconds, outcome, error):
+        with self._lock:
+            self.times[route].append(seconds)
+            if error:
+                self.errors[route][str(outcome)] += 1
+
+    def summary(self, elapsed):
+        routes = {}
+        for route, times in sorted(self.times.items()):
+            times = sorted(times)
+            errors = dict(self.errors.get(route, {}))
+            routes[route] = {
+                'requests': len(times),
+                'errors': sum(errors.values()),
+                'error_kinds': errors,
+                'per_second': len(times) / elapsed,
+                'p50_s': percentile(times, 0.50),
+                'p95_s': percentile(times, 0.95),
+                'p99_s': percentile(times, 0.99),
+                'max_s': times[-1],
+            }
+        return routes
+
+
+class VirtualUser(threading.Thread):
+    """One learner: registers, then runs args.sessions quiz sessions back to back."""
+
+    def __init__(self, index, args, base_url, words, recorder, start_delay):
+        super().__init__(name=f'vu-{index}', daemon=True)
+        self.username = f"{args.prefix}{index}"
+        self.args = args
+        self.base_url = base_url
+        self.words = words
+        self.recorder = recorder
+        self.start_delay = start_delay
+        self.rng = random.Random(index)
+        self.http = requests.Session()
+        self.expected_score = 0
+        self.answers = 0
+        self.sessions = 0
+        self.score_mismatches = []   # (expected, server's running score) from submit responses
+        self.registered = False
+
+    def _request(self, route, method, path, error_ok=(), **kwargs):
+        """Timed request, recorded under route; returns the response or None if it raised."""
+        kwargs.setdefault('allow_redirects', False)
+        start = time.perf_counter()
+        try:
+            response = self.http.request(method, self.base_url + path, timeout=self.args.timeout, **kwargs)
+            if kwargs.get('stream'):
+                response.content  # time the whole body, not just the headers
+        except requests.RequestException as e:
+            self.recorder.record(route, time.perf_counter() - start, type(e).__name__, True)
+            return None
+        status = response.status_code
+        self.recorder.record(route, time.perf_counter() - start, status, status >= 400 and status not in error_ok)
+        return response
+
+    def _think(self):
+        if self.args.think:
+            time.sleep(self.rng.uniform(0, 2 * self.args.think))
+
+    def run(self):
+        time.sleep(self.start_delay)
+        response = self._request('/register', 'POST', '/register',
+                                 data={'username': self.username, 'password': PASSWORD, 'confirm': PASSWORD})
+        self.registered = response is not None and response.status_code == 302
+        if not self.registered:
+            return
+        for _ in range(self.args.sessions):
+            self.run_session()
+            self.sessions += 1
+
+    def run_session(self):
+        self._request('/login', 'POST', '/login', data={'username': self.username, 'password': PASSWORD})
+        self._think()
+        questions = self.open_quiz()
+        attempt_id = uuid.uuid4().hex
+        pending = []
+        for index, question in enumerate(questions):
+            self._think()
+            correct = self.rng.random() < self.args.accuracy
+            answer = {'index': index, 'word': question['word'], 'correct': correct}
+            if self.args.submit == 'single':
+                self.submit('/quiz/submit', answer, [answer])
+            else:
+                pending.append(answer)
+                if len(pending) == BATCH_SIZE or index == len(questions) - 1:
+                    self.submit('/quiz/submit_batch', {'attempt_id': attempt_id, 'answers': pending}, pending)
+                    pending = []
+        self._think()
+        word = self.rng.choice(self.words)
+        self._request('/lookup', 'POST', '/lookup', json={'word': word}, error_ok=(404,))
+        self._think()
+        self._request('/leaderboard', 'GET', '/leaderboard')
+
+    def open_quiz(self):
+        """Opens /quiz and returns its questions, read from the page or from /quiz/stream."""
+        num = self.args.questions
+        response = self._request('/quiz', 'GET', f'/quiz?num={num}')
+        if response is None or response.status_code != 200:
+            return []
+        match = QUESTIONS_RE.search(response.text)
+        questions = json.loads(match.group(1)) if match else []
+        stream = STREAM_RE.search(response.text)
+        if questions or not stream or stream.group(1) == '0':
+            return questions
+
+        response = self._request('/quiz/stream', 'GET', f'/quiz/stream?num={num}', stream=True)
+        if response is None or response.status_code != 200:
+            return []
+        event = None
+        for line in response.text.splitlines():
+            if line.startswith('event: '):
+                event = line[len('event: '):]
+            elif line.startswith('data: ') and event == 'question':
+                questions.append(json.loads(line[len('data: '):]))
+        return questions
+
+    def submit(self, route, body, answers):
+        response = self._request(route, 'POST', route, json=body)
+        if response is None or response.status_code != 200:
+            return
+        self.answers += len(answers)
+        self.expected_score += sum(CORRECT_POINTS if a['correct'] else WRONG_POINTS for a in answers)
+        score = response.json().get('score')
+        if score != self.expected_score:
+            self.score_mismatches.append((self.expected_score, score))
+            self.expected_score = score  # judge later answers against what the server has now
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args, workdir, api_url):
+    """Starts the app in workdir; returns (process, base_url) once it answers."""
+    port = free_port()
+    if args.server_cmd:
+        cmd = shlex.split(args.server_cmd.format(port=port))
+    else:
+        cmd = [sys.executable, '-c',
+               f"import app; app.app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    env = dict(os.environ, VOCAB_API_URL=api_url,
+               PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get('PYTHONPATH')])))
+    log = open(os.path.join(workdir, 'server.log'), mode='w', encoding='utf-8')
+    process = subprocess.Popen(cmd, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f"http://127.0.0.1:{port}"
+
+    deadline = time.monotonic() + args.startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}; see {log.name}")
+        try:
+            requests.get(base_url + '/login', timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Server didn't answer within {args.startup_timeout}s; see {log.name}")
+
+
+def stop_server(process):
+    """SIGTERM, so the app's final flush (user_state.UserState.close) writes everything."""
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def saved_scores(workdir):
+    """Scores as the app saved them, read back through data_manager from the server's directory."""
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        import data_manager
+        users = data_manager.load_users()
+        return {username: user['score'] for username, user in users.items()}
+    finally:
+        os.chdir(cwd)
+
+
+def print_report(report):
+    totals = report['totals']
+    print(f"\n{totals['virtual_users']} virtual users, {totals['sessions']} sessions, "
+          f"{totals['answers']} answers in {totals['elapsed_s']:.1f}s "
+          f"({totals['requests_per_second']:.1f} req/s, {totals['sessions_per_second']:.2f} sessions/s)")
+    print(f"{'route':<22}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for route, r in report['routes'].items():
+        print(f"{route:<22}{r['requests']:>9}{r['errors']:>8}{r['per_second']:>9.1f}"
+              f"{r['p50_s'] * 1000:>9.1f}{r['p95_s'] * 1000:>9.1f}{r['p99_s'] * 1000:>9.1f}{r['max_s'] * 1000:>9.1f}")
+        if r['error_kinds']:
+            print(f"{'':<22}errors: {r['error_kinds']}")
+    lost = report['lost_updates']
+    print(f"\nLost updates: {lost['response_mismatches']} submit responses with a wrong running score", end='')
+    if lost['saved_mismatches'] is None:
+        print("; saved scores not checked (external server)")
+    else:
+        print(f"; {lost['saved_mismatches']} of {lost['users_checked']} users saved with a wrong score")
+        for username, expected, saved in lost['examples']:
+            print(f"  {username}: expected {expected}, saved {saved}")
+    api = report['fake_dictionary']
+    if api:
+        print(f"Fake dictionary: {api['requests']} requests, {api['errors']} injected errors")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the web app with concurrent virtual users.")
+    parser.add_argument('--users', type=int, default=50, help="virtual users running at once")
+    parser.add_argument('--sessions', type=int, default=3, help="quiz sessions per virtual user")
+    parser.add_argument('--questions', type=int, default=10, help="questions per quiz")
+    parser.add_argument('--submit', choices=['single', 'batch'], default='single',
+                        help="answer through /quiz/submit, or /quiz/submit_batch like quiz.js")
+    parser.add_argument('--accuracy', type=float, default=0.7, help="share of answers that are correct")
+    parser.add_argument('--think', type=float, default=0.0, help="mean pause between actions, seconds")
+    parser.add_argument('--ramp', type=float, default=1.0, help="seconds over which virtual users start")
+    parser.add_argument('--timeout', type=float, default=30.0, help="per-request timeout, seconds")
+    parser.add_argument('--words', type=int, default=2000, help="words in the synthetic words.csv")
+    parser.add_argument('--app-users', type=int, default=10000, help="existing users in users.csv")
+    parser.add_argument('--latency', type=float, default=0.05, help="fake dictionary latency, seconds")
+    parser.add_argument('--jitter', type=float, default=0.02, help="fake dictionary latency jitter, seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of fake dictionary 5xx answers")
+    parser.add_argument('--not-found-rate', type=float, default=0.05, help="share of fake dictionary 404s")
+    parser.add_argument('--server-cmd', help="command starting the app, with {port}; default: Flask's threaded server")
+    parser.add_argument('--url', help="load an already-running app instead (saved scores aren't checked)")
+    parser.add_argument('--startup-timeout', type=float, default=60.0)
+    parser.add_argument('--prefix', default=f"vu{int(time.time())}-", help="username prefix for virtual users")
+    parser.add_argument('--out', default=os.path.join(HERE, 'results', 'loadtest-' + time.strftime('%Y%m%d-%H%M%S') + '.json'))
+    args = parser.parse_args()
+    args.out = os.path.abspath(args.out)
+
+    fake = process = None
+    workdir = None
+    words = make_words(args.words)
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        fake = FakeDictionary(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                              not_found_rate=args.not_found_rate)
+        api_url = fake.start()
+        workdir = tempfile.mkdtemp(prefix='vocab-load-')
+        write_words_csv(os.path.join(workdir, 'words.csv'), words)
+        write_users_csv(os.path.join(workdir, 'users.csv'), make_users(args.app_users, words))
+        process, base_url = start_server(args, workdir, api_url)
+        print(f"Server at {base_url}, files in {workdir}", file=sys.stderr)
+
+    recorder = Recorder()
+    vus = [VirtualUser(i, args, base_url, words, recorder, args.ramp * i / max(args.users, 1))
+           for i in range(args.users)]
+    start = time.perf_counter()
+    for vu in vus:
+        vu.start()
+    for vu in vus:
+        vu.join()
+    elapsed = time.perf_counter() - start
+
+    saved = None
+    if process:
+        stop_server(process)
+        saved = saved_scores(workdir)
+    if fake:
+        fake.stop()
+
+    registered = [vu for vu in vus if vu.registered]
+    saved_wrong = [(vu.username, vu.expected_score, saved.get(vu.username)) for vu in registered
+                   if saved.get(vu.username) != vu.expected_score] if saved is not None else []
+    requests_made = sum(len(t) for t in recorder.times.values())
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'args': {k: v for k, v in vars(args).items() if k != 'out'},
+            'base_url': base_url,
+            'workdir': workdir,
+        },
+        'totals': {
+            'virtual_users': len(vus),
+            'registered': len(registered),
+            'sessions': sum(vu.sessions for vu in vus),
+            'answers': sum(vu.answers for vu in vus),
+            'requests': requests_made,
+            'elapsed_s': elapsed,
+            'requests_per_second': requests_made / elapsed,
+            'sessions_per_second': sum(vu.sessions for vu in vus) / elapsed,
+        },
+        'routes': recorder.summary(elapsed),
+        'lost_updates': {
+            'response_mismatches': sum(len(vu.score_mismatches) for vu in vus),
+            'users_checked': len(registered) if saved is not None else 0,
+            'saved_mismatches': len(saved_wrong) if saved is not None else None,
+            'examples': saved_wrong[:10],
+        },
+        'fake_dictionary': {'requests': fake.requests, 'errors': fake.errors} if fake else None,
+    }
+    print_report(report)
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, mode='w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.out}")
+
+    lost = report['lost_updates']
+    return 1 if lost['response_mismatches'] or lost['saved_mismatches'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
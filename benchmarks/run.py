@@ -0,0 +1,253 @@
+# benchmarks/run.py
+"""
+Benchmarks for the quiz, lookup and persistence hot paths.
+
+Everything runs in a scratch directory against a local fake dictionary API, so
+the real users.csv, caches and the network are never touched. Results are
+written as JSON so runs can be compared.
+
+    python benchmarks/run.py                       # default sizes
+    python benchmarks/run.py --users 1000 10000 100000 1000000 --out results.json
+    python benchmarks/run.py --only quiz users
+    python benchmarks/run.py --only memory --users 100000
+
+For concurrent users against the running web app, see loadtest.py.
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(HERE)
+sys.path.insert(0, REPO_ROOT)
+
+from fake_dictionary import FakeDictionary
+from generate import make_words, make_users, write_words_csv, write_users_csv
+
+SUITES = ['quiz', 'users', 'memory', 'submit', 'leaderboard']
+
+
+def measure(fn, repeat):
+    """Runs fn repeat times; returns timing stats in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return {
+        'runs': repeat,
+        'mean_s': statistics.mean(times),
+        'p50_s': times[len(times) // 2],
+        'p95_s': times[min(int(len(times) * 0.95), len(times) - 1)],
+        'min_s': times[0],
+        'max_s': times[-1],
+    }
+
+
+def bench_quiz(results, args):
+    """create_quiz with a cold cache (every word fetched) and a warm one, for each quiz size."""
+    import api_client
+    from question_bank import build_bank
+    from vocabulary_bot import VocabularyBot
+
+    bot = VocabularyBot()
+    warm_bank = {}
+    for num in (5, 10, 15):
+        def cold():
+            with api_client._cache_lock:
+                api_client._cache.clear()
+            if api_client._store:
+                api_client._store.clear()
+            bot.bank.entries.clear()
+            bot.create_quiz(num)
+
+        stats = measure(cold, args.repeat)
+        results.append(dict(name='create_quiz', params={'questions': num, 'cache': 'cold',
+                                                        'api_latency_s': args.latency}, **stats))
+
+        # Warm: every word banked, as after `python question_bank.py` (built once, without fake latency)
+        if not warm_bank:
+            latency, args.fake.latency = args.fake.latency, 0.0
+            build_bank(bot.bank)
+            args.fake.latency = latency
+            warm_bank.update(bot.bank.entries)
+        bot.bank.entries.update(warm_bank)
+        stats = measure(lambda: bot.create_quiz(num), args.repeat * 20)
+        results.append(dict(name='create_quiz', params={'questions': num, 'cache': 'warm'}, **stats))
+
+
+def bench_users(results, args):
+    """load_users (parsing users.csv, and from the user snapshot) / save_users at each user count."""
+    import data_manager
+
+    words = make_words(args.words)
+    for count in args.users:
+        users = make_users(count, words)
+        write_users_csv(data_manager.USER_DATA_FILE, users)
+        size = os.path.getsize(data_manager.USER_DATA_FILE)
+        repeat = max(1, args.repeat if count <= 100000 else 1)
+
+        # Parsing only: load_users would also write the snapshot after a CSV load
+        stats = measure(data_manager.load_users_csv, repeat)
+        results.append(dict(name='load_users', params={'users': count, 'bytes': size, 'from': 'csv'}, **stats))
+        data_manager.save_users_snapshot(data_manager.load_users_csv())  # fresh, so load_users maps it
+        stats = measure(data_manager.load_users, repeat)
+        results.append(dict(name='load_users', params={'users': count, 'bytes': size, 'from': 'snapshot'}, **stats))
+        stats = measure(lambda: data_manager.save_users(users), repeat)
+        results.append(dict(name='save_users', params={'users': count, 'bytes': size}, **stats))
+    write_users_csv(data_manager.USER_DATA_FILE, make_users(args.app_users, words))
+
+
+def load_users_as_dicts(path):
+    """users.csv parsed into the original dict-of-dicts layout, for the memory comparison."""
+    users = {}
+    with open(path, mode='r', newline='', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        next(reader, None)
+        for username, password, score, incorrect_json in reader:
+            users[username] = {'password': password, 'score': int(score),
+                               'incorrect_words': json.loads(incorrect_json)}
+    return users
+
+
+def traced_size(load):
+    """Bytes still allocated by load()'s result, measured with tracemalloc."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = load()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return after - before, result
+
+
+def bench_memory(results, args):
+    """Resident size of the loaded users: original dicts vs the compact User/MissCounts layout."""
+    import data_manager
+    from user_model import WORDS
+
+    words = make_words(args.words)
+    WORDS.extend(words)  # the app interns words.csv at startup; its table is shared, not per user
+    for count in args.users:
+        write_users_csv(data_manager.USER_DATA_FILE, make_users(count, words))
+        missed = 0
+        for layout, load in (('dict', lambda: load_users_as_dicts(data_manager.USER_DATA_FILE)),
+                             ('compact', data_manager.load_users_csv)):
+            size, users = traced_size(load)
+            missed = sum(len(u['incorrect_words']) for u in users.values())
+            del users
+            results.append({'name': 'users_memory', 'params': {'users': count, 'layout': layout,
+                                                               'missed_words': missed},
+                            'bytes': size, 'bytes_per_user': size / count})
+    write_users_csv(data_manager.USER_DATA_FILE, make_users(args.app_users, words))
+
+
+def bench_submit(results, args):
+    """Answers per second through the Flask routes (single client, in-process test client)."""
+    import app as web
+
+    client = web.app.test_client()
+    with client.session_transaction() as sess:
+        sess['username'] = 'user0'
+
+    count = args.submits
+    start = time.perf_counter()
+    for i in range(count):
+        client.post('/quiz/submit', json={'word': f"word{i % 50}", 'correct': i % 3 != 0})
+    elapsed = time.perf_counter() - start
+    results.append({'name': 'submit_quiz', 'params': {'answers': count, 'users': len(web.bot.users)},
+                    'runs': count, 'total_s': elapsed, 'per_second': count / elapsed})
+
+    batch = 15
+    start = time.perf_counter()
+    for i in range(count // batch):
+        answers = [{'index': j, 'word': f"word{j}", 'correct': j % 3 != 0} for j in range(batch)]
+        client.post('/quiz/submit_batch', json={'attempt_id': f"bench-{i}", 'answers': answers})
+    elapsed = time.perf_counter() - start
+    results.append({'name': 'submit_quiz_batch', 'params': {'answers': count // batch * batch, 'batch': batch},
+                    'runs': count // batch, 'total_s': elapsed, 'per_second': count // batch * batch / elapsed})
+    web.bot.save()
+
+
+def bench_leaderboard(results, args):
+    """Rendering /leaderboard (first page and a deep page) with the app's users loaded."""
+    import app as web
+
+    client = web.app.test_client()
+    with client.session_transaction() as sess:
+        sess['username'] = 'user0'
+    users = len(web.bot.users)
+    last_page = max(len(web.bot.leaderboard) // 50, 1)
+    for page in (1, last_page):
+        stats = measure(lambda: client.get(f'/leaderboard?page={page}'), args.repeat * 5)
+        results.append(dict(name='leaderboard_page', params={'users': users, 'page': page}, **stats))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the vocabulary app benchmarks.")
+    parser.add_argument('--only', nargs='+', choices=SUITES, default=SUITES)
+    parser.add_argument('--users', nargs='+', type=int, default=[1000, 10000, 100000],
+                        help="user counts for load/save_users (add 1000000 for the full run)")
+    parser.add_argument('--app-users', type=int, default=10000, help="users loaded by the app for submit/leaderboard")
+    parser.add_argument('--words', type=int, default=2000, help="words in the synthetic words.csv")
+    parser.add_argument('--latency', type=float, default=0.05, help="fake dictionary latency in seconds")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--submits', type=int, default=3000)
+    parser.add_argument('--out', default=os.path.join(HERE, 'results', time.strftime('%Y%m%d-%H%M%S') + '.json'))
+    args = parser.parse_args()
+    args.out = os.path.abspath(args.out)
+
+    fake = FakeDictionary(latency=args.latency)
+    os.environ['VOCAB_API_URL'] = fake.start()
+    args.fake = fake
+
+    # All app files (users.csv, caches, journal, bank) live in a scratch directory
+    workdir = tempfile.mkdtemp(prefix='vocab-bench-')
+    os.chdir(workdir)
+    words = make_words(args.words)
+    write_words_csv('words.csv', words)
+    write_users_csv('users.csv', make_users(args.app_users, words))
+
+    results = []
+    # users runs first: it leaves an app-sized users.csv behind for the app-level suites
+    for suite in [s for s in SUITES if s in args.only]:
+        print(f"Running {suite} ...", file=sys.stderr)
+        globals()[f'bench_{suite}'](results, args)
+    fake.stop()
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'args': {k: v for k, v in vars(args).items() if k not in ('out', 'fake')},
+            'workdir': workdir,
+            'fake_api_requests': fake.requests,
+        },
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, mode='w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    for r in results:
+        if 'mean_s' in r:
+            timing = f"{r['mean_s'] * 1000:.2f} ms mean"
+        elif 'bytes' in r:
+            timing = f"{r['bytes'] / 2**20:.1f} MiB ({r['bytes_per_user']:.0f} B/user)"
+        else:
+            timing = f"{r['per_second']:.0f}/s"
+        print(f"{r['name']:<20} {json.dumps(r['params']):<60} {timing}")
+    print(f"Results written to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# circuit_breaker.py
+import threading
+import time
+
+CLOSED = 'closed'        # calls go through
+OPEN = 'open'            # calls fail fast until reset_timeout passes
+HALF_OPEN = 'half_open'  # one trial call decides whether to close again
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing dependency after `failure_threshold` consecutive
+    failures, then lets a single trial call through every `reset_timeout` seconds.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Returns True if a call may be made now. Every allowed call must end in
+        record_success, record_failure or release, or a half-open breaker would
+        wait on its trial call forever.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.time() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.time()
+
+    def release(self):
+        """Ends an allowed call that neither succeeded nor failed (e.g. it raised), freeing the half-open trial."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._trial_running = False
+
+    def status(self):
+        with self._lock:
+            retry_in = 0.0
+            if self.state == OPEN:
+                retry_in = max(self.reset_timeout - (time.time() - self.opened_at), 0.0)
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'rejected_calls': self.rejected,
+                'retry_in_seconds': round(retry_in, 1),
+            }
@@ -1,11 +1,86 @@
 # config.py
+import os
 
 # File paths
 USER_DATA_FILE = "users.csv"
 WORDS_FILE = "words.csv"
 
-# API URL for dictionary lookup (Free Dictionary API)
-API_URL = "https://api.dictionaryapi.dev/api/v2/entries/en/"
+# User store backend: "csv" (users.csv + answer journal) or "sqlite" (USER_DB_FILE, WAL mode).
+# Users are kept in the app process's memory: run one worker process per data directory
+# (threads are fine); with "csv" a second process refuses to start.
+USER_STORE = "csv"
+USER_DB_FILE = "users.sqlite3"
+
+# Binary users snapshot (CSV store): mapped at startup, users decoded on first access
+USER_SNAPSHOT = True
+USER_SNAPSHOT_FILE = "users.snapshot"   # rebuilt whenever users.csv is newer
+
+# API URL for dictionary lookup (Free Dictionary API); VOCAB_API_URL points it at a local stub
+API_URL = os.environ.get("VOCAB_API_URL", "https://api.dictionaryapi.dev/api/v2/entries/en/")
+
+# Dictionary API client
+API_TIMEOUT = 2               # seconds per request
+API_POOL_SIZE = 10            # keep-alive connections kept per host
+API_RETRIES = 1               # retries for connection errors and 429/5xx answers
+API_BACKOFF = 0.2             # seconds; doubles on each retry
+API_BREAKER_FAILURES = 5      # consecutive failures before lookups fail fast
+API_BREAKER_RESET = 30        # seconds before one trial request is let through again
+API_ASYNC_CONNECTIONS = 100   # open connections shared by async lookups (asgi_app.py)
+
+# Dictionary lookup cache
+CACHE_FILE = "lookup_cache.sqlite3"
+CACHE_MEMORY_ENTRIES = 1000           # in-process LRU in front of the file
+CACHE_MAX_ENTRIES = 50000             # rows kept on disk before LRU eviction
+CACHE_MAX_BYTES = 64 * 1024 * 1024    # JSON bytes kept on disk before LRU eviction
+CACHE_TTL = 30 * 24 * 3600            # found entries: 30 days
+CACHE_NEGATIVE_TTL = 24 * 3600        # "not found" entries: 1 day
+CACHE_BUSY_TIMEOUT = 5                # seconds a worker waits for another's write to the shared file
+CACHE_FETCH_LEASE = 10                # seconds one worker may hold a word while fetching it for the host
+CACHE_FETCH_POLL = 0.05               # seconds between checks while waiting on another worker's fetch
+
+# Offline dictionary (build with: python offline_dictionary.py import dump.jsonl)
+OFFLINE_DICTIONARY_FILE = "dictionary.idx"   # consulted before the API when present
+
+# HTTP caching for GET /api/lookup/<word>
+LOOKUP_HTTP_MAX_AGE = 24 * 3600       # browsers/proxies may reuse a lookup response this long
+
+# Lookup page suggestions (words.csv, cached and banked words)
+SUGGEST_LIMIT = 8                     # completions and corrections returned per query
+SUGGEST_MAX_DISTANCE = 2              # edits allowed between a typo and a correction
+
+# Offline question bank (build with: python question_bank.py)
+QUESTION_BANK_FILE = "question_bank.json"
+QUESTION_BANK_WARM_ON_START = False   # fill missing bank words in the background when app.py starts
+
+# Quiz word usability (words with no synonyms/antonyms or not in the dictionary are skipped)
+WORD_STATUS_FILE = "word_status.json"
+WORD_STATUS_RETRY = 7 * 24 * 3600     # re-check a skipped word after this many seconds
+
+# Global word difficulty (share of learners missing each word; needs NumPy)
+DIFFICULTY_WEIGHT = 2.0         # the most-missed words come up to 1 + this times as often in quizzes; 0 = uniform
+DIFFICULTY_TOP_K = 10           # hardest words overall shown on the feedback page
+
+# Answer journal (append-only log folded into users.csv periodically)
+JOURNAL_FILE = "answers.journal"
+JOURNAL_FSYNC_EVERY = 20        # fsync after this many records...
+JOURNAL_FSYNC_INTERVAL = 1.0    # ...or this many seconds, whichever comes first
+JOURNAL_COMPACT_EVERY = 1000    # records between users.csv snapshots...
+JOURNAL_COMPACT_INTERVAL = 300  # ...or this many seconds, whichever comes first
+
+# In-memory user state: changed users are written by a background thread
+USER_FLUSH_INTERVAL = 5.0       # seconds between flushes of dirty users
+USER_FLUSH_THRESHOLD = 500      # flush early once this many users are dirty
 
 # Quiz settings
-QUIZ_OPTIONS = [5, 10, 15]
\ No newline at end of file
+QUIZ_OPTIONS = [5, 10, 15]
+QUIZ_LOOKUP_WORKERS = 8     # dictionary lookups running at once while building a quiz
+QUIZ_DEADLINE = 6.0         # seconds to wait for lookups before serving a shorter quiz
+QUIZ_STREAMING = True       # /quiz renders at once and questions arrive over /quiz/stream
+QUIZ_ATTEMPTS_REMEMBERED = 10000   # recent quiz attempt ids kept to drop retried batch submissions
+
+# Review quizzes (spaced repetition over each user's missed words)
+REVIEW_FILE = "review_queue.json"
+REVIEW_INTERVALS = [0, 3600, 86400, 3 * 86400, 7 * 86400, 21 * 86400]  # seconds until due, by box
+
+# Leaderboard
+LEADERBOARD_PAGE_SIZE = 50
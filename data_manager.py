@@ -1,7 +1,20 @@
 # data_manager.py
 import csv
+import hashlib
 import json
-from config import USER_DATA_FILE, WORDS_FILE
+import os
+import time
+from collections.abc import Mapping
+from config import USER_DATA_FILE, WORDS_FILE, USER_STORE, USER_DB_FILE, USER_SNAPSHOT, USER_SNAPSHOT_FILE
+from sqlite_store import SQLiteUserStore
+from user_model import User, WORDS
+from user_snapshot import open_snapshot, write_snapshot
+from metrics import STORE_LOAD, STORE_SAVE, STORE_BYTES
+
+# Sidecar recording which answer-journal records are already folded into users.csv
+CHECKPOINT_FILE = USER_DATA_FILE + '.checkpoint'
+
+_store = None  # SQLiteUserStore, opened on first use when USER_STORE == "sqlite"
 
 def load_common_words():
     """Loads quiz words from a CSV file (column name: 'word'). Returns a list."""
@@ -28,11 +41,81 @@ def load_common_words():
         print(f"Error loading words: {e}")
     return words
 
+def words_mtime():
+    """Modification time of words.csv (ns), or None if it doesn't exist; when it changes, the words are reloaded."""
+    try:
+        return os.stat(WORDS_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+def user_store():
+    """
+    Returns the SQLite user store when USER_STORE == "sqlite", else None (CSV).
+    The first call migrates users.csv into an empty database.
+    """
+    global _store
+    if USER_STORE != 'sqlite':
+        return None
+    if _store is None:
+        _store = SQLiteUserStore(USER_DB_FILE)
+        if _store.is_empty() and os.path.exists(USER_DATA_FILE):
+            migrate_csv_to_sqlite(_store)
+    return _store
+
+def migrate_csv_to_sqlite(store, force=False):
+    """
+    One-shot copy of users.csv (with the usual malformed-row recovery) into the SQLite store.
+    Refuses to replace users already in the store unless force is set. Returns the number
+    of users copied, or None if it refused.
+    """
+    if not force and not store.is_empty():
+        print(f"{store.path} already has users; not replacing them. Use --force to overwrite.")
+        return None
+    users = load_users_csv()
+    store.save_users(users)
+    print(f"Migrated {len(users)} users from {USER_DATA_FILE} to {store.path}.")
+    return len(users)
+
 def load_users():
     """
-    Loads users from USER_DATA_FILE and returns a dict:
-    { username: {'password': str, 'score': int, 'incorrect_words': {word: count}} }
+    Loads users from the configured store and returns a dict:
+    { username: User(password, score, incorrect_words={word: count}) }
+    Users read and write like the {'password', 'score', 'incorrect_words'} dicts
+    of the file formats; see user_model.py for the compact layout.
+    With USER_SNAPSHOT, a fresh users.snapshot is mapped instead of parsing users.csv
+    and users are decoded on first access (see user_snapshot.py); a stale or missing
+    snapshot is rebuilt from the CSV.
     """
+    WORDS.extend(load_common_words())  # quiz words get the first (lowest) ids, whichever store users come from
+    store = user_store()
+    if store:
+        with STORE_LOAD.time(store='sqlite'):
+            return store.load_users()
+    if USER_SNAPSHOT:
+        with STORE_LOAD.time(store='snapshot'):
+            users = open_snapshot(USER_SNAPSHOT_FILE, USER_DATA_FILE)
+        if users is not None:
+            return users
+    with STORE_LOAD.time(store='csv'):
+        users = load_users_csv()
+    if USER_SNAPSHOT and os.path.exists(USER_DATA_FILE):
+        save_users_snapshot(users)
+    return users
+
+def save_users_snapshot(users):
+    """Writes users.snapshot for the next fast start. Returns True on success."""
+    start = time.perf_counter()
+    try:
+        write_snapshot(USER_SNAPSHOT_FILE, users)
+    except Exception as e:
+        print(f"Error saving user snapshot: {e}")
+        return False
+    STORE_BYTES.inc(os.path.getsize(USER_SNAPSHOT_FILE), target='users_snapshot')
+    STORE_SAVE.observe(time.perf_counter() - start, target='users_snapshot')
+    return True
+
+def load_users_csv():
+    """Loads users from USER_DATA_FILE, recovering what it can from malformed rows."""
     users = {}
     try:
         with open(USER_DATA_FILE, mode='r', newline='', encoding='utf-8') as file:
@@ -88,11 +171,7 @@ def load_users():
                     except Exception:
                         score_val = 0
 
-                users[username] = {
-                    'password': password,
-                    'score': score_val,
-                    'incorrect_words': incorrect_words
-                }
+                users[username] = User(password, score_val, incorrect_words)
     except FileNotFoundError:
         # no users file yet, return empty dict
         pass
@@ -100,25 +179,125 @@ def load_users():
         print(f"Error loading users: {e}")
     return users
 
-def save_users(users):
+def save_users(users, journal_seq=None):
+    """
+    Saves every user to the configured store. Returns True on success.
+    journal_seq only applies to the CSV store (see save_users_csv).
+    """
+    store = user_store()
+    if store:
+        try:
+            with STORE_SAVE.time(target='sqlite'):
+                store.save_users(users)
+            return True
+        except Exception as e:
+            print(f"Error saving users: {e}")
+            return False
+    return save_users_csv(users, journal_seq)
+
+def save_users_csv(users, journal_seq=None):
     """
     Writes the users dict back to CSV with header:
     username,password,score,incorrect_words_json
     The incorrect_words column is json.dumps(...) so it's safely quoted for CSV.
+    The file is written to a temp path and renamed, so a crash never leaves half a file.
+    journal_seq is the last answer-journal record included in this snapshot (see answer_journal.py).
+    Returns True if the snapshot was written.
     """
+    tmp_path = USER_DATA_FILE + '.tmp'
+    start = time.perf_counter()
     try:
-        with open(USER_DATA_FILE, mode='w', newline='', encoding='utf-8') as file:
+        with open(tmp_path, mode='w', newline='', encoding='utf-8') as file:
             writer = csv.writer(file)
             writer.writerow(['username', 'password', 'score', 'incorrect_words_json'])
             for username, data in users.items():
                 pw = data.get('password', '')
                 score = data.get('score', 0)
                 incorrect = data.get('incorrect_words', {}) or {}
-                # Ensure it's a dict
-                if not isinstance(incorrect, dict):
-                    incorrect = {}
+                # Ensure it's a dict (users hold packed MissCounts)
+                incorrect = dict(incorrect) if isinstance(incorrect, Mapping) else {}
                 # Dump JSON with double quotes; csv.writer will quote this field as needed
                 wrong_json = json.dumps(incorrect, ensure_ascii=False)
                 writer.writerow([username, pw, score, wrong_json])
+            file.flush()
+            os.fsync(file.fileno())
+        if journal_seq is not None:
+            # Checkpoint goes first: until the rename lands its digest won't match users.csv
+            _write_checkpoint(journal_seq, _file_digest(tmp_path), os.stat(tmp_path))
+        STORE_BYTES.inc(os.path.getsize(tmp_path), target='users_csv')
+        os.replace(tmp_path, USER_DATA_FILE)
+        STORE_SAVE.observe(time.perf_counter() - start, target='users_csv')
     except Exception as e:
         print(f"Error saving users: {e}")
+        return False
+    if USER_SNAPSHOT:
+        save_users_snapshot(users)  # written after the CSV, so it isn't mistaken for stale
+    return True
+
+def snapshot_seq():
+    """
+    Returns the last answer-journal sequence number folded into users.csv,
+    or 0 if unknown (no checkpoint, or users.csv was rewritten without one).
+    """
+    try:
+        with open(CHECKPOINT_FILE, mode='r', encoding='utf-8') as file:
+            checkpoint = json.load(file)
+        # Same size and mtime as when the checkpoint was written: skip hashing the whole file
+        st = os.stat(USER_DATA_FILE)
+        if checkpoint.get('stat') == [st.st_size, st.st_mtime_ns] \
+                or checkpoint.get('sha1') == _file_digest(USER_DATA_FILE):
+            return int(checkpoint.get('seq', 0))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Error reading checkpoint: {e}")
+    return 0
+
+def _write_checkpoint(seq, digest, st):
+    tmp_path = CHECKPOINT_FILE + '.tmp'
+    with open(tmp_path, mode='w', encoding='utf-8') as file:
+        json.dump({'seq': seq, 'sha1': digest, 'stat': [st.st_size, st.st_mtime_ns]}, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, CHECKPOINT_FILE)
+
+def _file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, mode='rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def apply_answer(users, username, word, is_correct):
+    """
+    Applies one quiz answer to the users dict and returns the updated user:
+    +5 and one less miss for a correct answer, -1 and one more miss otherwise.
+    Unknown usernames get a placeholder entry.
+    """
+    user = users.get(username)
+    if not user:
+        user = User('unknown')
+        users[username] = user
+
+    if 'incorrect_words' not in user:
+        user['incorrect_words'] = {}
+
+    if is_correct:
+        user['score'] += 5
+        if word in user['incorrect_words']:
+            user['incorrect_words'][word] -= 1
+            if user['incorrect_words'][word] <= 0:
+                del user['incorrect_words'][word]
+    else:
+        user['score'] -= 1
+        user['incorrect_words'][word] = user['incorrect_words'].get(word, 0) + 1
+    return user
+
+if __name__ == '__main__':
+    import sys
+    if sys.argv[1:2] == ['migrate'] and set(sys.argv[2:]) <= {'--force'}:
+        if migrate_csv_to_sqlite(SQLiteUserStore(USER_DB_FILE), force='--force' in sys.argv[2:]) is None:
+            sys.exit(1)
+    else:
+        print("Usage: python data_manager.py migrate [--force]   (copy users.csv into USER_DB_FILE;"
+              " --force replaces users already there)")
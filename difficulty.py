@@ -0,0 +1,238 @@
+# difficulty.py
+import threading
+
+from config import DIFFICULTY_WEIGHT
+from user_model import WORDS, MissCounts
+from user_snapshot import LazyUsers, user_items
+
+try:
+    import numpy as np
+except ImportError:  # without it there are no global difficulty stats and quizzes sample uniformly
+    np = None
+
+
+class DifficultyIndex:
+    """
+    How hard each word is across all learners, as NumPy columns indexed by word id
+    (user_model.WORDS): `misses` is every user's outstanding miss count for the word
+    summed, `learners` the number of users who have it among their missed words.
+    They are the word x user miss matrix summed over users; its rows are the users'
+    own MissCounts, so the matrix is never stored twice.
+
+    Built once from the users (on a thread with background=True), then kept current
+    from every answer, so queries are a few vector operations over the vocabulary
+    and never touch users. A word's miss rate is the share of users missing it.
+
+    `lock` is the lock answers are applied under (UserState.lock). The build reads
+    each user under it, so an answer lands either before the build reads that user
+    (and is in what it reads) or after (and is applied as a change once it is done).
+    """
+
+    def __init__(self, users, weight=DIFFICULTY_WEIGHT, background=False, lock=None):
+        self.users = users
+        self.weight = weight
+        self.available = np is not None
+        self._users_lock = lock if lock is not None else threading.Lock()
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._read = set()       # users the running build has read (guarded by the users lock)
+        self._pending = []       # (username, changes, read already) recorded while it runs
+        self._version = 0        # bumped on every change; cached results are keyed on it
+        self._weights = None     # (version, per-word keep probabilities for quiz sampling)
+        self._word_ids = None    # (words list, their ids), for repeated queries over the same vocabulary
+        if not self.available:
+            self._ready.set()
+            return
+        self._misses = np.zeros(len(WORDS), dtype=np.int64)
+        self._learners = np.zeros(len(WORDS), dtype=np.int64)
+        if background:
+            threading.Thread(target=self._build, name='difficulty-build', daemon=True).start()
+        else:
+            self._build()
+
+    def _build(self):
+        try:
+            ids, counts = [], []
+            for username, user in user_items(self.users):
+                with self._users_lock:
+                    # LazyUsers hands out a fresh copy of users not looked up yet; answers
+                    # only ever change the loaded one, so read that if there is one now
+                    live = self.users.loaded(username) if isinstance(self.users, LazyUsers) \
+                        else self.users.get(username)
+                    missed = (live if live is not None else user).get('incorrect_words')
+                    if missed and isinstance(missed, MissCounts):
+                        wids, n = missed.arrays()
+                        ids.append(np.array(wids, dtype=np.int64))
+                        counts.append(np.array(n, dtype=np.int64))
+                    elif missed:  # a plain dict kept for odd counts (see user_model.compact_misses)
+                        ids.append(np.array([WORDS.id_for(w) for w in missed], dtype=np.int64))
+                        counts.append(np.array([c if type(c) is int else 0 for c in missed.values()],
+                                               dtype=np.int64))
+                    self._read.add(username)
+            if ids:
+                ids, counts = np.concatenate(ids), np.concatenate(counts)
+                held = counts > 0
+                size = len(WORDS)
+                misses = np.bincount(ids[held], weights=counts[held], minlength=size).astype(np.int64)
+                learners = np.bincount(ids[held], minlength=size).astype(np.int64)
+                with self._lock:
+                    self._misses, self._learners = misses, learners
+        except Exception as e:
+            print(f"Error building difficulty index: {e}")
+        finally:
+            with self._lock:
+                for username, changes, read in self._pending:
+                    if read or username not in self._read:  # else the build read them as changed
+                        self._apply(changes)
+                self._pending = []
+                self._read = set()
+                self._version += 1
+                self._ready.set()
+
+    def _grow(self, size):
+        """Makes room for word ids below size. Caller holds the lock."""
+        if size > len(self._misses):
+            size = max(size, 2 * len(self._misses))
+            self._misses = np.concatenate([self._misses, np.zeros(size - len(self._misses), dtype=np.int64)])
+            self._learners = np.concatenate([self._learners, np.zeros(size - len(self._learners), dtype=np.int64)])
+
+    def record(self, username, changes):
+        """
+        Applies one user's answers, given as {word: (miss count before, miss count after)}.
+        Registered as a UserState.on_answers hook, so it runs under the users lock and
+        never waits: while the build runs, changes are kept and applied once it is
+        done, except for users it read only after the change (it counted them as changed).
+        """
+        if not self.available or not changes:
+            return
+        with self._lock:
+            if not self._ready.is_set():
+                self._pending.append((username, changes, username in self._read))
+                return
+            self._apply(changes)
+            self._version += 1
+
+    def _apply(self, changes):
+        """Caller holds the lock."""
+        for word, (before, after) in changes.items():
+            before = before if type(before) is int and before > 0 else 0
+            after = after if type(after) is int and after > 0 else 0
+            if before == after:
+                continue
+            wid = WORDS.id_for(word)
+            self._grow(wid + 1)
+            self._misses[wid] += after - before
+            self._learners[wid] += (after > 0) - (before > 0)
+
+    # --- Queries ---
+    def _ids(self, words):
+        """Word ids for a list of words (-1 for words never missed by anyone), cached for the last list asked about."""
+        cached = self._word_ids
+        if cached is not None and cached[0] is words:
+            return cached[1]
+        ids = np.fromiter((-1 if wid is None else wid for wid in map(WORDS.find, words)),
+                          dtype=np.int64, count=len(words))
+        self._word_ids = (words, ids)
+        return ids
+
+    def _columns(self, words=None):
+        """
+        (misses, learners) for the given words, or for every word id, copied under the lock,
+        plus a function naming position i of those columns.
+        """
+        with self._lock:
+            misses, learners = self._misses, self._learners
+            if words is None:
+                n = min(len(WORDS), len(misses))
+                return misses[:n].copy(), learners[:n].copy(), WORDS.word
+            ids = self._ids(words)
+            known = (ids >= 0) & (ids < len(misses))
+            picked = np.where(known, ids, 0)
+            return np.where(known, misses[picked], 0), np.where(known, learners[picked], 0), words.__getitem__
+
+    def _user_count(self):
+        return max(len(self.users), 1)
+
+    def miss_rates(self, words):
+        """{word: share of users who have it among their missed words}."""
+        if not self.available:
+            return {}
+        self._ready.wait()
+        words = list(words)
+        _, learners, _ = self._columns(words)
+        rates = learners / self._user_count()
+        return dict(zip(words, rates.tolist()))
+
+    def hardest(self, k=10, words=None):
+        """
+        The k words missed by the most users (more outstanding misses breaks ties),
+        restricted to words if given: [{'word', 'miss_rate', 'learners', 'misses'}].
+        """
+        if not self.available or k <= 0:
+            return []
+        self._ready.wait()
+        misses, learners, name = self._columns(words)
+        candidates = np.flatnonzero(learners)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-learners[candidates], k - 1)[:k]]
+        order = candidates[np.lexsort((-misses[candidates], -learners[candidates]))]
+        users = self._user_count()
+        return [{'word': name(i), 'miss_rate': int(learners[i]) / users,
+                 'learners': int(learners[i]), 'misses': int(misses[i])} for i in order]
+
+    def percentiles(self, qs=(50, 90, 95, 99), words=None):
+        """Miss-rate percentiles over words (default: every word seen), as {'p50': rate, ...}."""
+        if not self.available:
+            return {}
+        self._ready.wait()
+        _, learners, _ = self._columns(words)
+        if not len(learners):
+            return {f"p{q}": 0.0 for q in qs}
+        values = np.percentile(learners / self._user_count(), qs)
+        return {f"p{q}": float(v) for q, v in zip(qs, values)}
+
+    def stats(self, words=None, k=10):
+        """What /api/difficulty returns."""
+        if not self.available:
+            return {'available': False}
+        self._ready.wait()
+        misses, learners, _ = self._columns(words)
+        return {
+            'available': True,
+            'users': len(self.users),
+            'words': len(learners),
+            'words_missed': int(np.count_nonzero(learners)),
+            'misses': int(misses.sum()),
+            'percentiles': self.percentiles(words=words),
+            'hardest': self.hardest(k, words=words),
+        }
+
+    # --- Quiz sampling ---
+    def sampler(self):
+        """
+        A keep(word) function for QuizWords.sample: 1 for the most-missed word, down to
+        1 / (1 + weight) for words nobody misses, so the hardest words come up to
+        1 + weight times as often. None when weighting is off or the index isn't built yet.
+        """
+        if not self.available or self.weight <= 0 or not self._ready.is_set():
+            return None
+        cached = self._weights
+        if cached is None or cached[0] != self._version:
+            with self._lock:
+                version, learners = self._version, self._learners.copy()
+            top = learners.max() if len(learners) else 0
+            if top > 0:
+                keep = (1 + self.weight * learners / top) / (1 + self.weight)
+            else:
+                keep = np.ones(0)
+            cached = self._weights = (version, keep.tolist())
+        keep = cached[1]
+        if not keep:
+            return None
+        floor = 1 / (1 + self.weight)
+        find = WORDS.find
+
+        def weigh(word):
+            wid = find(word)
+            return keep[wid] if wid is not None and wid < len(keep) else floor
+        return weigh
@@ -0,0 +1,79 @@
+# distractors.py
+import random
+import threading
+
+
+class DistractorIndex:
+    """
+    Lowercased, de-duplicated array of the quiz vocabulary, built once when the
+    words are loaded. Distractors are drawn by rejection sampling from it, so a
+    question costs a handful of random picks instead of copying the vocabulary.
+    Words can be added and removed in place when words.csv changes.
+    """
+
+    def __init__(self, words=()):
+        self.words = []
+        self._known = {}  # word -> its position in self.words
+        self._lock = threading.Lock()
+        for word in words:
+            self._add(word)
+
+    def __len__(self):
+        return len(self.words)
+
+    def _add(self, word):
+        word = word.strip().lower()
+        if word and word not in self._known:
+            self._known[word] = len(self.words)
+            self.words.append(word)
+
+    def add(self, word):
+        with self._lock:
+            self._add(word)
+
+    def remove(self, word):
+        """Drops a word by moving the last word into its slot (order doesn't matter for sampling)."""
+        with self._lock:
+            i = self._known.pop(word.strip().lower(), None)
+            if i is None:
+                return
+            last = self.words.pop()
+            if i < len(self.words):
+                self.words[i] = last
+                self._known[last] = i
+
+    def sample(self, k, exclude=(), extra=()):
+        """
+        Returns up to k distinct words drawn uniformly from extra ∪ vocabulary,
+        skipping anything in exclude (lowercase). Same distribution as sampling
+        from the full de-duplicated union, without building it.
+        """
+        with self._lock:
+            return self._sample(k, exclude, extra)
+
+    def _sample(self, k, exclude, extra):
+        exclude = set(exclude)
+        # Only the extra words missing from the vocabulary widen the pool; the rest are already in it
+        extra = [w for w in {e.lower() for e in extra} if w not in self._known]
+        size = len(self.words) + len(extra)
+        if not size:
+            return []
+
+        picked = []
+        chosen = set()
+        attempts = 0
+        max_attempts = 8 * k + 16
+        while len(picked) < k and attempts < max_attempts:
+            attempts += 1
+            r = random.randrange(size)
+            word = self.words[r] if r < len(self.words) else extra[r - len(self.words)]
+            if word in exclude or word in chosen:
+                continue
+            chosen.add(word)
+            picked.append(word)
+
+        if len(picked) < k:
+            # Tiny or mostly excluded pool: fall back to an exact scan
+            rest = [w for w in self.words + extra if w not in exclude and w not in chosen]
+            picked.extend(random.sample(rest, min(k - len(picked), len(rest))))
+        return picked
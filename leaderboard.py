@@ -0,0 +1,85 @@
+# leaderboard.py
+import bisect
+import threading
+
+
+class Leaderboard:
+    """
+    Users ranked by score (highest first), kept sorted as scores change so
+    pages never need a full sort. Entries are (-score, username) tuples in a
+    sorted list: an update is two binary searches plus a list shift, and
+    equal scores are ordered by username.
+
+    Pass either users or scores ((username, score) pairs). With background=True
+    the initial sort runs on a thread and callers only wait for it on first use.
+    """
+
+    def __init__(self, users=None, scores=None, background=False):
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._scores = {}
+        self._entries = []
+        if users:
+            scores = ((u, d.get('score', 0)) for u, d in users.items())
+        if background:
+            threading.Thread(target=self._build, args=(scores,), name='leaderboard-build', daemon=True).start()
+        else:
+            self._build(scores)
+
+    def _build(self, scores):
+        try:
+            built = dict(scores or ())
+            entries = sorted((-s, u) for u, s in built.items())
+            with self._lock:
+                self._scores, self._entries = built, entries
+        except Exception as e:
+            print(f"Error building leaderboard: {e}")
+        finally:
+            self._ready.set()
+
+    def __len__(self):
+        self._ready.wait()
+        return len(self._entries)
+
+    def update(self, username, score):
+        """Moves username to its new position for score (adds it if new)."""
+        self._ready.wait()
+        with self._lock:
+            old = self._scores.get(username)
+            if old == score:
+                return
+            if old is not None:
+                del self._entries[bisect.bisect_left(self._entries, (-old, username))]
+            bisect.insort(self._entries, (-score, username))
+            self._scores[username] = score
+
+    def remove(self, username):
+        self._ready.wait()
+        with self._lock:
+            old = self._scores.pop(username, None)
+            if old is not None:
+                del self._entries[bisect.bisect_left(self._entries, (-old, username))]
+
+    def top(self, k=10, offset=0):
+        """Returns [(rank, username, score)] for ranks offset+1 .. offset+k."""
+        self._ready.wait()
+        with self._lock:
+            page = self._entries[offset:offset + k]
+        return [(offset + i + 1, u, -neg) for i, (neg, u) in enumerate(page)]
+
+    def rank(self, username):
+        """Returns the 1-based rank of username, or None if unknown."""
+        self._ready.wait()
+        with self._lock:
+            score = self._scores.get(username)
+            if score is None:
+                return None
+            return bisect.bisect_left(self._entries, (-score, username)) + 1
+
+    def around(self, username, radius=2):
+        """Returns username's entry plus up to `radius` neighbours on each side."""
+        rank = self.rank(username)
+        if rank is None:
+            return []
+        start = max(rank - 1 - radius, 0)
+        return self.top(k=rank - start + radius, offset=start)
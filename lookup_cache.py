@@ -0,0 +1,232 @@
+# lookup_cache.py
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Returned by LookupCache.get when nothing usable is stored for a word
+MISSING = object()
+
+# A hit only rewrites last_used when the stored value is older than this, so
+# reads from many worker processes don't queue up on SQLite's single writer
+TOUCH_INTERVAL = 60
+
+
+class LookupCache:
+    """
+    Persistent, size-bounded cache for dictionary entries, backed by SQLite.
+    Entries expire after `ttl` seconds, "not found" results are cached for
+    `negative_ttl` seconds, and the least recently used rows are evicted once
+    the cache holds more than `max_entries` rows or `max_bytes` of JSON.
+
+    The file is shared by every worker process on the host (WAL mode, so readers
+    never block each other or the writer), and claim()/release() let one process
+    fetch a word from the API while the others wait for its row to appear.
+    """
+
+    def __init__(self, path, max_entries=50000, max_bytes=64 * 1024 * 1024,
+                 ttl=30 * 24 * 3600, negative_ttl=24 * 3600, busy_timeout=5.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.busy_timeout = busy_timeout
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._conn = self._connect()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " word TEXT PRIMARY KEY,"
+            " data TEXT,"              # NULL means the API said "not found"
+            " size INTEGER NOT NULL,"
+            " stored_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS fetching ("
+            " word TEXT PRIMARY KEY,"
+            " owner INTEGER NOT NULL,"  # pid of the process fetching it
+            " claimed_at REAL NOT NULL)"
+        )
+        conn.commit()
+        return conn
+
+    def _check_fork(self):
+        """A forked worker (e.g. gunicorn --preload) must not reuse its parent's connection."""
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._conn = self._connect()
+            self._pid = os.getpid()
+
+    def get(self, word, allow_stale=False):
+        """
+        Returns the cached entry (a dict), None for a cached "not found",
+        or MISSING when the word is unknown or its entry has expired.
+        allow_stale=True also returns expired entries (used while the API is down);
+        expired rows are kept until LRU eviction for that reason.
+        """
+        now = time.time()
+        self._check_fork()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, stored_at, last_used FROM entries WHERE word = ?", (word,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return MISSING
+
+            data, stored_at, last_used = row
+            max_age = self.ttl if data is not None else self.negative_ttl
+            if now - stored_at > max_age and not allow_stale:
+                self.misses += 1
+                return MISSING
+
+            if now - last_used > TOUCH_INTERVAL:
+                self._conn.execute("UPDATE entries SET last_used = ? WHERE word = ?", (now, word))
+                self._conn.commit()
+
+        if data is None:
+            self.negative_hits += 1
+            return None
+        self.hits += 1
+        return json.loads(data)
+
+    def stored_at(self, word):
+        """Returns when the word's entry was stored (epoch seconds), or None if it isn't cached."""
+        self._check_fork()
+        with self._lock:
+            row = self._conn.execute("SELECT stored_at FROM entries WHERE word = ?", (word,)).fetchone()
+        return row[0] if row else None
+
+    def words(self):
+        """Every word with a cached entry (not "not found" ones), expired or not."""
+        self._check_fork()
+        with self._lock:
+            rows = self._conn.execute("SELECT word FROM entries WHERE data IS NOT NULL").fetchall()
+        return [word for (word,) in rows]
+
+    def put(self, word, entry):
+        """Stores an entry for word; pass entry=None to cache a "not found"."""
+        data = json.dumps(entry, ensure_ascii=False) if entry is not None else None
+        size = len(data.encode('utf-8')) if data is not None else 0
+        now = time.time()
+        self._check_fork()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (word, data, size, stored_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (word, data, size, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def claim(self, word, lease):
+        """
+        Marks word as being fetched by this process. Returns False if another live
+        claim exists; a claim older than `lease` seconds (its owner crashed or hung)
+        is taken over.
+        """
+        now = time.time()
+        self._check_fork()
+        with self._lock:
+            self._conn.execute("DELETE FROM fetching WHERE word = ? AND claimed_at < ?", (word, now - lease))
+            claimed = self._conn.execute(
+                "INSERT OR IGNORE INTO fetching (word, owner, claimed_at) VALUES (?, ?, ?)",
+                (word, self._pid, now)
+            ).rowcount == 1
+            self._conn.commit()
+        return claimed
+
+    def release(self, word):
+        """Drops this process's claim on word (after its fetch was stored or failed)."""
+        self._check_fork()
+        with self._lock:
+            self._conn.execute("DELETE FROM fetching WHERE word = ? AND owner = ?", (word, self._pid))
+            self._conn.commit()
+
+    def poll(self, word):
+        """
+        For a process waiting on another's fetch: returns (entry, claimed), where
+        entry is what get() would return (MISSING if nothing yet) and claimed tells
+        whether the fetch is still running. Doesn't count as a hit or miss.
+        """
+        self._check_fork()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, stored_at FROM entries WHERE word = ?", (word,)
+            ).fetchone()
+            claimed = self._conn.execute(
+                "SELECT 1 FROM fetching WHERE word = ?", (word,)
+            ).fetchone() is not None
+        if row is None:
+            return MISSING, claimed
+        data, stored_at = row
+        if time.time() - stored_at > (self.ttl if data is not None else self.negative_ttl):
+            return MISSING, claimed
+        return (json.loads(data) if data is not None else None), claimed
+
+    def is_not_found(self, word):
+        """True if the API's last answer for word was "not found" and that hasn't expired. Doesn't count as a hit or miss."""
+        self._check_fork()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT stored_at FROM entries WHERE word = ? AND data IS NULL", (word,)
+            ).fetchone()
+        return row is not None and time.time() - row[0] <= self.negative_ttl
+
+    def _evict(self):
+        """Drops least recently used rows until both limits are respected. Caller holds the lock."""
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        while count > self.max_entries or total > self.max_bytes:
+            # Over the byte limit only: drop a small batch and re-check
+            batch = count - self.max_entries if count > self.max_entries else 10
+            rows = self._conn.execute(
+                "SELECT word, size FROM entries ORDER BY last_used LIMIT ?", (batch,)
+            ).fetchall()
+            if not rows:
+                break
+            self._conn.executemany("DELETE FROM entries WHERE word = ?", [(w,) for w, _ in rows])
+            count -= len(rows)
+            total -= sum(s for _, s in rows)
+            self.evictions += len(rows)
+
+    def stats(self):
+        """Returns hit/miss counters and current size of the cache."""
+        self._check_fork()
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            'hit_ratio': (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': count,
+            'bytes': total,
+        }
+
+    def clear(self):
+        self._check_fork()
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("DELETE FROM fetching")
+            self._conn.commit()
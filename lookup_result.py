@@ -0,0 +1,64 @@
+# lookup_result.py
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+
+
+def _unique(items):
+    """Drops repeats, keeping first-seen order."""
+    return tuple(dict.fromkeys(items))
+
+
+@dataclass(frozen=True)
+class LookupResult:
+    """
+    A dictionary entry reduced to what the app shows: one definition per part of
+    speech plus the synonyms and antonyms across all meanings. Built once per
+    lookup; the CLI text, the /lookup JSON and /api/lookup/<word> all come from it.
+    """
+    word: str
+    meanings: tuple = ()     # ((part_of_speech, definition), ...)
+    synonyms: tuple = ()
+    antonyms: tuple = ()
+    fetched_at: float = field(default_factory=time.time, compare=False)
+
+    @classmethod
+    def from_entry(cls, word, data, fetched_at=None):
+        """Builds a result from a Free Dictionary API entry (as returned by api_lookup)."""
+        meanings = data.get('meanings', [])
+        return cls(
+            word=word,
+            meanings=tuple((m.get('partOfSpeech', ''), m['definitions'][0].get('definition', 'No definition available'))
+                           for m in meanings if m.get('definitions')),
+            synonyms=_unique(s for m in meanings for s in m.get('synonyms', [])),
+            antonyms=_unique(a for m in meanings for a in m.get('antonyms', [])),
+            fetched_at=fetched_at if fetched_at is not None else time.time(),
+        )
+
+    @property
+    def meaning(self):
+        """Definitions as display lines: "(noun) ..."."""
+        return "\n".join(f"({pos}) {definition}" for pos, definition in self.meanings)
+
+    @property
+    def etag(self):
+        """Content hash, so the tag only changes when the shown data does."""
+        payload = json.dumps(self.to_dict(), sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def to_dict(self):
+        return {
+            'word': self.word,
+            'meanings': [{'partOfSpeech': pos, 'definition': definition} for pos, definition in self.meanings],
+            'synonyms': list(self.synonyms),
+            'antonyms': list(self.antonyms),
+        }
+
+    def format(self, limit=10):
+        """The CLI's text block, with at most `limit` synonyms and antonyms."""
+        lines = [f"--- {self.word.upper()} ---"]
+        lines += [f"({pos}) {definition}" for pos, definition in self.meanings]
+        lines.append("\nSynonyms: " + (', '.join(self.synonyms[:limit]) or "None"))
+        lines.append("Antonyms: " + (', '.join(self.antonyms[:limit]) or "None"))
+        return "\n".join(lines)
@@ -0,0 +1,144 @@
+# metrics.py
+import bisect
+import threading
+import time
+
+# Latency buckets in seconds (upper bounds); +Inf is implicit
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+_collectors = []
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels."""
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus style), optionally split by labels."""
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}  # label key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 3)
+            series[i] += 1  # index len(buckets) is the +Inf-only bucket
+            series[-2] += value
+            series[-1] += 1
+
+    def time(self, **labels):
+        """Context manager observing the duration of its block."""
+        return _Timer(self, labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((k, list(v)) for k, v in self._series.items())
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', repr(bound))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {values[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {values[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {values[-1]}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+def register_collector(fn):
+    """fn() returns [(name, help, type, value)] gauges computed at scrape time."""
+    _collectors.append(fn)
+    return fn
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        try:
+            samples = collector()
+        except Exception as e:
+            print(f"Error collecting metrics: {e}")
+            continue
+        for name, help_text, kind, value in samples:
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"])
+    return '\n'.join(lines) + '\n'
+
+
+# --- Hot-path metrics ---
+HTTP_LATENCY = Histogram('vocab_http_request_duration_seconds', "Flask request latency by route, method and status.")
+LOOKUP_LATENCY = Histogram('vocab_lookup_duration_seconds',
+                           "api_lookup latency by outcome (hit, coalesced, miss, not_found, error, breaker_open).")
+STORE_LOAD = Histogram('vocab_user_store_load_seconds', "load_users duration by store.")
+STORE_SAVE = Histogram('vocab_user_store_save_seconds', "save_users / journal sync duration by target.")
+STORE_BYTES = Counter('vocab_user_store_bytes_written_total', "Bytes written by target (users_csv, journal).")
+QUIZ_LOOKUPS = Counter('vocab_quiz_lookups_total', "Dictionary lookups made while building quizzes.")
+QUIZ_QUESTIONS = Counter('vocab_quiz_questions_total', "Quiz questions produced, by source (bank, lookup).")
+
+
+@register_collector
+def _quiz_efficiency():
+    questions = sum(QUIZ_QUESTIONS._values.values())
+    lookups = QUIZ_LOOKUPS.value()
+    ratio = lookups / questions if questions else 0.0
+    return [('vocab_quiz_lookups_per_question', "Dictionary lookups per quiz question produced.", 'gauge', ratio)]
@@ -0,0 +1,140 @@
+# offline_dictionary.py
+import argparse
+import json
+import mmap
+import os
+import struct
+
+from config import OFFLINE_DICTIONARY_FILE
+from slot_table import SlotTable, pack_slots
+
+# File layout (little-endian):
+#   header   MAGIC, entry count, offset of the key region, offset of the data region
+#   slots    one slot per word, sorted by the word's UTF-8 bytes (see slot_table.py)
+#   keys     the words, back to back
+#   data     each word's entry as compact JSON
+MAGIC = b'VOCDICT1'
+HEADER = struct.Struct('<8sIQQ')
+
+
+class OfflineDictionary:
+    """
+    Read-only dictionary index, memory-mapped. Opening it only reads the header,
+    and lookups binary-search the sorted slot table in place, so startup cost does
+    not grow with the dictionary and every worker process shares the same pages
+    through the OS page cache instead of holding its own copy.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, mode='rb') as file:
+            self._mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.mtime = os.fstat(file.fileno()).st_mtime  # when this index was imported
+        magic, self.count, self._keys_at, self._data_at = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not an offline dictionary index")
+        self._table = SlotTable(self._mm, self.count, HEADER.size, self._keys_at)
+
+    @classmethod
+    def open(cls, path=OFFLINE_DICTIONARY_FILE):
+        """Returns the index at path, or None if there isn't a usable one."""
+        if not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except Exception as e:
+            print(f"⚠ Could not open offline dictionary '{path}': {e}")
+            return None
+
+    def _find(self, word):
+        """Returns the word's slot, or None."""
+        return self._table.find(word.lower().strip().encode('utf-8'))
+
+    def get(self, word):
+        """Returns the stored entry for a word, or None if the dump didn't have it."""
+        slot = self._find(word)
+        if slot is None:
+            return None
+        start = self._data_at + slot[2]
+        return json.loads(self._mm[start:start + slot[3]])
+
+    def __contains__(self, word):
+        return self._find(word) is not None
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self._mm.close()
+
+
+def _entries(dump_path):
+    """Yields (word, entry) from a JSONL dump; each line is an entry or a list of entries (as the API returns)."""
+    with open(dump_path, mode='r', encoding='utf-8') as file:
+        for line_no, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Skipping line {line_no}: {e}")
+                continue
+            if isinstance(entry, list):
+                entry = entry[0] if entry else None
+            word = entry.get('word') if isinstance(entry, dict) else None
+            if not word:
+                print(f"Skipping line {line_no}: no 'word' field")
+                continue
+            yield word, entry
+
+
+def build_index(dump_path, path=OFFLINE_DICTIONARY_FILE):
+    """
+    Builds the index file from a JSONL dump of dictionary entries. The first entry
+    for a word wins, as with api_lookup. Written to a temp file and renamed, so
+    processes that already have the old index mapped keep reading it safely.
+    Returns the number of words indexed.
+    """
+    records = {}
+    for word, entry in _entries(dump_path):
+        key = word.lower().strip().encode('utf-8')
+        if key not in records:
+            records[key] = json.dumps(entry, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    keys = sorted(records)
+    slots, key_region, data_region = pack_slots((key, records[key]) for key in keys)
+
+    keys_at = HEADER.size + len(slots)
+    data_at = keys_at + len(key_region)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, mode='wb') as file:
+        file.write(HEADER.pack(MAGIC, len(keys), keys_at, data_at))
+        file.write(slots)
+        file.write(key_region)
+        file.write(data_region)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+    return len(keys)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Offline dictionary index used before the dictionary API.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    importer = commands.add_parser('import', help="build the index from a JSONL dump of dictionary entries")
+    importer.add_argument('dump', help="JSONL file, one API-shaped entry per line")
+    importer.add_argument('--out', default=OFFLINE_DICTIONARY_FILE)
+    getter = commands.add_parser('get', help="print the indexed entry for a word")
+    getter.add_argument('word')
+    getter.add_argument('--index', default=OFFLINE_DICTIONARY_FILE)
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        count = build_index(args.dump, args.out)
+        print(f"Indexed {count} words into {args.out} ({os.path.getsize(args.out)} bytes).")
+    else:
+        index = OfflineDictionary.open(args.index)
+        entry = index.get(args.word) if index else None
+        print(json.dumps(entry, indent=2, ensure_ascii=False) if entry else f"'{args.word}' is not in the index.")
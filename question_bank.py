@@ -0,0 +1,134 @@
+# question_bank.py
+import argparse
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import QUESTION_BANK_FILE, QUIZ_LOOKUP_WORKERS
+from data_manager import load_common_words
+from api_client import api_lookup
+
+
+def extract_relations(data):
+    """Returns (synonyms, antonyms) from a dictionary entry as lowercase sets."""
+    meanings = data.get('meanings', [])
+    synonyms = set(s.lower() for m in meanings for s in m.get('synonyms', []))
+    antonyms = set(a.lower() for m in meanings for a in m.get('antonyms', []))
+    return synonyms, antonyms
+
+
+class QuestionBank:
+    """
+    Offline store of synonym/antonym sets per quiz word, so quizzes can be
+    built without calling the dictionary API. Saved as compact JSON:
+    {word: [[synonyms...], [antonyms...]]}. Words the API knows but that have
+    no synonyms or antonyms are kept with empty lists so they are not retried.
+    """
+
+    def __init__(self, path=QUESTION_BANK_FILE):
+        self.path = path
+        self._entries = None  # read from disk on first use, not at startup
+        self.dirty = False
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            with self._load_lock:
+                if self._entries is None:
+                    self.load()
+        return self._entries
+
+    def load(self):
+        try:
+            with open(self.path, mode='r', encoding='utf-8') as file:
+                raw = json.load(file)
+            self._entries = {w: (frozenset(s), frozenset(a)) for w, (s, a) in raw.items()}
+        except FileNotFoundError:
+            self._entries = {}
+        except Exception as e:
+            print(f"Error loading question bank: {e}")
+            self._entries = {}
+
+    def save(self):
+        """Writes the bank atomically (temp file + rename) so readers never see half a file."""
+        with self._lock:
+            raw = {w: [sorted(s), sorted(a)] for w, (s, a) in self.entries.items()}
+            self.dirty = False
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, mode='w', encoding='utf-8') as file:
+                json.dump(raw, file, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error saving question bank: {e}")
+
+    def save_if_dirty(self):
+        if self.dirty:
+            self.save()
+
+    def get(self, word):
+        """Returns (synonyms, antonyms) for a banked word, or None if it isn't banked yet."""
+        return self.entries.get(word.lower())
+
+    def add(self, word, synonyms, antonyms):
+        with self._lock:
+            self.entries[word.lower()] = (frozenset(synonyms), frozenset(antonyms))
+            self.dirty = True
+
+    def add_entry(self, word, data):
+        """Banks a dictionary entry; returns False if there was no entry to bank."""
+        if not data:
+            return False
+        synonyms, antonyms = extract_relations(data)
+        self.add(word, synonyms, antonyms)
+        return True
+
+    def __contains__(self, word):
+        return word.lower() in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def build_bank(bank, words=None, force=False, workers=QUIZ_LOOKUP_WORKERS):
+    """
+    Runs every quiz word through api_lookup once and stores its synonym/antonym
+    sets in the bank. Already banked words are skipped unless force is set.
+    Returns (banked, failed) counts.
+    """
+    if words is None:
+        words = load_common_words()
+    todo = [w for w in words if force or w not in bank]
+    banked = failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for word, data in zip(todo, pool.map(api_lookup, todo)):
+            if bank.add_entry(word, data):
+                banked += 1
+            else:
+                failed += 1
+    bank.save_if_dirty()
+    return banked, failed
+
+
+def start_warmer(bank):
+    """Builds the missing part of the bank on a background thread (used on app start)."""
+    def warm():
+        banked, failed = build_bank(bank)
+        print(f"📚 Question bank warmed: {banked} new words, {failed} unavailable, {len(bank)} total.")
+
+    thread = threading.Thread(target=warm, name='question-bank-warmer', daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the offline question bank from the quiz word list.")
+    parser.add_argument('--force', action='store_true', help="re-fetch words that are already banked")
+    args = parser.parse_args()
+
+    bank = QuestionBank()
+    banked, failed = build_bank(bank, force=args.force)
+    print(f"Banked {banked} words ({failed} unavailable). Bank now holds {len(bank)} words in {bank.path}.")
@@ -0,0 +1,229 @@
+# quiz_words.py
+import json
+import math
+import os
+import random
+import threading
+import time
+
+from config import WORD_STATUS_FILE, WORD_STATUS_RETRY
+
+# What the dictionary had for a word, as far as quizzes are concerned
+USABLE = 'usable'               # has synonyms or antonyms
+NO_RELATIONS = 'no_relations'   # found, but nothing to ask about
+NOT_FOUND = 'not_found'         # the API doesn't know it
+DEAD = (NO_RELATIONS, NOT_FOUND)
+
+# Share of unchecked words assumed usable before any word has been checked (the old 2x oversampling),
+# and the lowest share ever assumed, so a bad start can't make a quiz draw the whole vocabulary
+DEFAULT_USABLE_RATE = 0.5
+MIN_USABLE_RATE = 0.25
+
+
+class QuizWords:
+    """
+    The quiz vocabulary (words.csv) plus a persistent per-word usability status,
+    saved as JSON: {word: [status, checked_at]}. Words known to be dead (no
+    synonyms/antonyms, or not in the dictionary) are kept out of the pool that
+    quizzes sample from; a dead status is re-checked after `retry_after` seconds
+    in case the dictionary has changed.
+
+    The pool is a list with a word -> position map, so set_words() can apply a
+    changed words.csv and mark() can drop a dead word in place.
+    """
+
+    def __init__(self, words=(), path=WORD_STATUS_FILE, retry_after=WORD_STATUS_RETRY):
+        self.path = path
+        self.retry_after = retry_after
+        self.dirty = False
+        self._lock = threading.Lock()
+        self._status = self._load()   # word -> [status, checked_at]
+        self._checked = {USABLE: 0, NO_RELATIONS: 0, NOT_FOUND: 0}
+        for status, _ in self._status.values():
+            self._checked[status] = self._checked.get(status, 0) + 1
+        self._vocabulary = set()
+        self._pool = []
+        self._pos = {}                # word -> position in _pool
+        self._next_retry = float('inf')
+        self.set_words(words)
+
+    def _load(self):
+        try:
+            with open(self.path, mode='r', encoding='utf-8') as file:
+                return {w: list(s) for w, s in json.load(file).items()}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Error loading word status: {e}")
+            return {}
+
+    def save(self):
+        """Writes the statuses atomically (temp file + rename)."""
+        with self._lock:
+            raw = {w: list(s) for w, s in self._status.items()}
+            self.dirty = False
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, mode='w', encoding='utf-8') as file:
+                json.dump(raw, file, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error saving word status: {e}")
+
+    def save_if_dirty(self):
+        if self.dirty:
+            self.save()
+
+    # --- Status ---
+    def _dead(self, word, now):
+        """Known dead and not due for a re-check. Caller holds the lock."""
+        status = self._status.get(word)
+        return status is not None and status[0] in DEAD and now - status[1] < self.retry_after
+
+    def status(self, word):
+        """USABLE, NO_RELATIONS, NOT_FOUND, or None if unchecked (or a dead status is due for a re-check)."""
+        word = word.lower()
+        with self._lock:
+            status = self._status.get(word)
+            if status is None or (status[0] in DEAD and time.time() - status[1] >= self.retry_after):
+                return None
+            return status[0]
+
+    def mark(self, word, status):
+        """Records what a lookup found for word; a dead word leaves the quiz pool."""
+        word = word.lower()
+        now = time.time()
+        with self._lock:
+            old = self._status.get(word)
+            if old is not None and old[0] == status and (status == USABLE or now - old[1] < self.retry_after):
+                return
+            if old is not None:
+                self._checked[old[0]] -= 1
+            self._checked[status] += 1
+            self._status[word] = [status, now]
+            self.dirty = True
+            if status in DEAD:
+                self._drop(word)
+                self._next_retry = min(self._next_retry, now + self.retry_after)
+            elif word in self._vocabulary:
+                self._put(word)
+
+    # --- Pool ---
+    def _put(self, word):
+        if word not in self._pos:
+            self._pos[word] = len(self._pool)
+            self._pool.append(word)
+
+    def _drop(self, word):
+        i = self._pos.pop(word, None)
+        if i is None:
+            return
+        last = self._pool.pop()
+        if i < len(self._pool):
+            self._pool[i] = last
+            self._pos[last] = i
+
+    def set_words(self, words):
+        """
+        Makes words the vocabulary, changing only what differs from the current one.
+        Returns (added, removed) word lists.
+        """
+        words = {w.strip().lower() for w in words if w.strip()}
+        now = time.time()
+        with self._lock:
+            added = [w for w in words if w not in self._vocabulary]
+            removed = [w for w in self._vocabulary if w not in words]
+            for word in removed:
+                self._drop(word)
+            for word in added:
+                if self._dead(word, now):
+                    self._next_retry = min(self._next_retry, self._status[word][1] + self.retry_after)
+                else:
+                    self._put(word)
+            self._vocabulary = words
+        return added, removed
+
+    def _revive(self, now):
+        """Puts dead words that are due for a re-check back in the pool. Caller holds the lock."""
+        if now < self._next_retry:
+            return
+        self._next_retry = float('inf')
+        for word in self._vocabulary:
+            status = self._status.get(word)
+            if status is None or status[0] not in DEAD:
+                continue
+            if now - status[1] >= self.retry_after:
+                self._put(word)
+            else:
+                self._next_retry = min(self._next_retry, status[1] + self.retry_after)
+
+    def _usable_rate(self):
+        """Share of checked words that turned out usable. Caller holds the lock."""
+        usable = self._checked[USABLE]
+        dead = self._checked[NO_RELATIONS] + self._checked[NOT_FOUND]
+        if not usable + dead:
+            return DEFAULT_USABLE_RATE
+        return max(MIN_USABLE_RATE, usable / (usable + dead))
+
+    def sample(self, num_questions, keep=None):
+        """
+        Random distinct words for a quiz of num_questions, never known-dead ones.
+        A word already known usable counts as one question; an unchecked word counts
+        as the share of checked words that were usable, so extra words are drawn
+        only to cover the unchecked ones that may turn out dead (with a margin of
+        two standard deviations, so few quizzes come up short).
+
+        keep(word), if given, is the chance (0 < p <= 1) that a drawn word is used,
+        so words with a higher value come up more often (see difficulty.py).
+        """
+        now = time.time()
+        with self._lock:
+            self._revive(now)
+            pool = self._pool
+            if not pool or num_questions <= 0:
+                return []
+            rate = self._usable_rate()
+            limit = min(len(pool), int(num_questions / MIN_USABLE_RATE))
+            # Small pool (relative to the draw): shuffle it; large pool: random picks, skipping repeats
+            shuffled = None
+            if limit * 2 >= len(pool):
+                if keep is None:
+                    shuffled = random.sample(pool, len(pool))
+                else:  # weighted shuffle: sort by random() ** (1 / weight), highest first
+                    shuffled = sorted(pool, key=lambda w: random.random() ** (1 / keep(w)), reverse=True)
+
+            picked = []
+            seen = set()
+            expected = variance = 0.0
+            while expected - 2 * math.sqrt(variance) < num_questions and len(picked) < limit:
+                if shuffled is not None:
+                    word = shuffled[len(picked)]
+                else:
+                    word = pool[random.randrange(len(pool))]
+                    if word in seen or (keep is not None and random.random() >= keep(word)):
+                        continue
+                    seen.add(word)
+                picked.append(word)
+                status = self._status.get(word)
+                if status is not None and status[0] == USABLE:
+                    expected += 1
+                else:
+                    expected += rate
+                    variance += rate * (1 - rate)
+        return picked
+
+    def __len__(self):
+        """Words in the pool (the vocabulary minus known-dead words)."""
+        return len(self._pool)
+
+    def stats(self):
+        with self._lock:
+            counts = {USABLE: 0, NO_RELATIONS: 0, NOT_FOUND: 0, 'unchecked': 0}
+            now = time.time()
+            for word in self._vocabulary:
+                status = self._status.get(word)
+                if status is None or (status[0] in DEAD and now - status[1] >= self.retry_after):
+                    counts['unchecked'] += 1
+                else:
+                    counts[status[0]] += 1
+            return {'vocabulary': len(self._vocabulary), 'pool': len(self._pool), **counts}
@@ -0,0 +1,148 @@
+# review_queue.py
+import heapq
+import json
+import os
+import threading
+import time
+
+from config import REVIEW_FILE, REVIEW_INTERVALS
+
+
+class ReviewQueue:
+    """
+    Spaced-repetition schedule over each user's missed words (Leitner boxes).
+    A wrong answer puts the word back in box 0 (due now); each right answer moves
+    it up a box, and the box decides how long until it is due again
+    (REVIEW_INTERVALS). Saved as compact JSON: {username: {word: [due, box]}}.
+
+    Every user gets a min-heap of (due, -misses, word) built on first use, so the
+    next N review words cost O(N log n) rather than sorting all of a user's words;
+    among words due at the same time the most-missed come first.
+    Rescheduling pushes a fresh heap entry and leaves the old one behind; stale
+    entries are skipped (and dropped) when they reach the top.
+    """
+
+    def __init__(self, users, path=REVIEW_FILE, intervals=REVIEW_INTERVALS):
+        self.users = users
+        self.path = path
+        self.intervals = intervals
+        self.schedules = None  # username -> {word: [due, box]}; read from disk on first use
+        self.dirty = False
+        self._heaps = {}       # username -> [(due, -misses, word), ...]
+        self._lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.path, mode='r', encoding='utf-8') as file:
+                self.schedules = json.load(file)
+            # Older files seeded new words with due = -misses; they are simply due now
+            now = time.time()
+            for words in self.schedules.values():
+                for item in words.values():
+                    if item[0] < 0:
+                        item[0] = now
+        except FileNotFoundError:
+            self.schedules = {}
+        except Exception as e:
+            print(f"Error loading review queue: {e}")
+            self.schedules = {}
+        self._heaps = {}
+
+    def save(self):
+        """Writes the schedules atomically (temp file + rename)."""
+        with self._lock:
+            if self.schedules is None:
+                return
+            raw = {u: {w: list(item) for w, item in words.items()}
+                   for u, words in self.schedules.items() if words}
+            self.dirty = False
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, mode='w', encoding='utf-8') as file:
+                json.dump(raw, file, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error saving review queue: {e}")
+
+    def save_if_dirty(self):
+        if self.dirty:
+            self.save()
+
+    def record(self, username, word, is_correct, now=None):
+        """Reschedules a word after an answer. Right answers on words never missed are ignored."""
+        now = time.time() if now is None else now
+        with self._lock:
+            schedule = self._schedule(username)
+            item = schedule.get(word)
+            if item is None:
+                if is_correct:
+                    return
+                item = schedule[word] = [now, 0]
+            box = min(item[1] + 1, len(self.intervals) - 1) if is_correct else 0
+            item[0], item[1] = now + self.intervals[box], box
+            self._push(username, item[0], word)
+            self.dirty = True
+
+    def next_words(self, username, n, now=None):
+        """
+        Returns up to n of the user's words that are due (or overdue) for review,
+        most overdue first. Words scheduled for later are held back, so the list
+        may be shorter than n or empty.
+        """
+        with self._lock:
+            schedule = self._schedule(username)
+            heap = self._heap(username)
+            now = time.time() if now is None else now  # after seeding, which makes new words due now
+            picked = []
+            while heap and len(picked) < n and heap[0][0] <= now:
+                entry = heapq.heappop(heap)
+                item = schedule.get(entry[2])
+                if item is not None and item[0] == entry[0]:
+                    picked.append(entry)
+            for entry in picked:
+                heapq.heappush(heap, entry)  # still scheduled; only answering moves them
+            return [word for _, _, word in picked]
+
+    def due_count(self, username, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            return sum(1 for due, _ in self._schedule(username).values() if due <= now)
+
+    def _schedule(self, username):
+        """Caller holds the lock. Seeds the schedule from incorrect_words the first time a user is seen."""
+        if self.schedules is None:
+            self.load()
+        schedule = self.schedules.get(username)
+        if schedule is None:
+            schedule = self.schedules[username] = {}
+            wrong = self.users.get(username, {}).get('incorrect_words', {})
+            now = time.time()
+            for word in wrong:
+                schedule[word] = [now, 0]  # due now; _heap puts the most-missed first
+            if schedule:
+                self.dirty = True
+        return schedule
+
+    def _heap(self, username):
+        """Caller holds the lock."""
+        heap = self._heaps.get(username)
+        if heap is None:
+            heap = [(due, -self._misses(username, word), word)
+                    for word, (due, _) in self._schedule(username).items()]
+            heapq.heapify(heap)
+            self._heaps[username] = heap
+        return heap
+
+    def _push(self, username, due, word):
+        """Caller holds the lock."""
+        heap = self._heaps.get(username)
+        if heap is None:
+            return  # built from the schedule on first use
+        heapq.heappush(heap, (due, -self._misses(username, word), word))
+        if len(heap) > 2 * len(self.schedules[username]) + 16:
+            del self._heaps[username]  # mostly stale entries; rebuild on next use
+
+    def _misses(self, username, word):
+        """How often the user has missed word (the tie-break between equally due words)."""
+        count = self.users.get(username, {}).get('incorrect_words', {}).get(word, 0)
+        return count if type(count) is int else 0
@@ -0,0 +1,58 @@
+# slot_table.py
+import struct
+
+# One fixed-size slot per key, sorted by the key's bytes:
+# (key offset, key length, value offset, value length), offsets relative to their region
+SLOT = struct.Struct('<QIQI')
+
+
+class SlotTable:
+    """
+    The sorted slot table inside a memory-mapped file (offline_dictionary.py,
+    user_snapshot.py): `count` slots from `slots_at`, the keys back to back from
+    `keys_at`. Lookups binary-search the table in place, so nothing is read
+    into memory up front.
+    """
+
+    def __init__(self, mm, count, slots_at, keys_at):
+        self._mm = mm
+        self.count = count
+        self._slots_at = slots_at
+        self._keys_at = keys_at
+
+    def slot(self, i):
+        return SLOT.unpack_from(self._mm, self._slots_at + i * SLOT.size)
+
+    def key(self, slot):
+        start = self._keys_at + slot[0]
+        return self._mm[start:start + slot[1]]
+
+    def find(self, key):
+        """Returns the slot for key (bytes), or None."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            slot = self.slot(mid)
+            probe = self.key(slot)
+            if probe < key:
+                lo = mid + 1
+            elif probe > key:
+                hi = mid
+            else:
+                return slot
+        return None
+
+
+def pack_slots(items):
+    """
+    Lays out (key, value) byte pairs, already sorted by key, as the three regions
+    of a slot table file: (slots, keys, values).
+    """
+    slots = bytearray()
+    key_region = bytearray()
+    value_region = bytearray()
+    for key, value in items:
+        slots += SLOT.pack(len(key_region), len(key), len(value_region), len(value))
+        key_region += key
+        value_region += value
+    return slots, key_region, value_region
@@ -0,0 +1,126 @@
+# sqlite_store.py
+import sqlite3
+import threading
+from collections.abc import Mapping
+
+from user_model import User
+
+
+class SQLiteUserStore:
+    """
+    SQLite (WAL mode) backend for user data, selected with USER_STORE = "sqlite".
+    Tables: users (credentials), scores (one row per user, indexed by score)
+    and misses (per-user, per-word miss counts). UserState saves changes with
+    save_changes(): answers are applied as indexed single-row updates, so an
+    answer touches only that user's score row and one misses row.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS users ("
+            " username TEXT PRIMARY KEY,"
+            " password TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS scores ("
+            " username TEXT PRIMARY KEY REFERENCES users(username) ON DELETE CASCADE,"
+            " score INTEGER NOT NULL DEFAULT 0);"
+            "CREATE INDEX IF NOT EXISTS scores_by_score ON scores(score DESC);"
+            "CREATE TABLE IF NOT EXISTS misses ("
+            " username TEXT NOT NULL REFERENCES users(username) ON DELETE CASCADE,"
+            " word TEXT NOT NULL,"
+            " count INTEGER NOT NULL,"
+            " PRIMARY KEY (username, word));"
+        )
+        self._conn.commit()
+
+    def is_empty(self):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM users LIMIT 1").fetchone() is None
+
+    def load_users(self):
+        """Returns every user in the same dict shape as data_manager.load_users."""
+        users = {}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT u.username, u.password, COALESCE(s.score, 0)"
+                " FROM users u LEFT JOIN scores s ON s.username = u.username"
+            ).fetchall()
+            for username, password, score in rows:
+                users[username] = User(password, score)
+            for username, word, count in self._conn.execute("SELECT username, word, count FROM misses"):
+                if username in users:
+                    users[username]['incorrect_words'][word] = count
+        return users
+
+    def save_users(self, users):
+        """Replaces the stored users with the given dict in one transaction."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM users")
+            for username, data in users.items():
+                self._write_user(username, data)
+
+    def save_changes(self, records=None, answers=None):
+        """
+        Saves what changed since the last save, in one transaction: records
+        ({username: data}) are written whole (new users, users changed in place),
+        answers ({username: [(word, is_correct), ...]}) are applied with indexed
+        single-row statements, by the same rules as data_manager.apply_answer.
+        """
+        with self._lock, self._conn:
+            for username, data in (records or {}).items():
+                self._conn.execute("DELETE FROM users WHERE username = ?", (username,))
+                self._write_user(username, data)
+            for username, user_answers in (answers or {}).items():
+                self._apply_answers(username, user_answers)
+
+    def _apply_answers(self, username, answers):
+        """Caller holds the lock and an open transaction."""
+        for word, is_correct in answers:
+            updated = self._conn.execute(
+                "UPDATE scores SET score = score + ? WHERE username = ?",
+                (5 if is_correct else -1, username)
+            ).rowcount
+            if not updated:
+                self._conn.execute("INSERT OR IGNORE INTO users (username, password) VALUES (?, 'unknown')", (username,))
+                self._conn.execute("INSERT OR REPLACE INTO scores (username, score) VALUES (?, ?)",
+                                   (username, 5 if is_correct else -1))
+            if is_correct:
+                self._conn.execute("UPDATE misses SET count = count - 1 WHERE username = ? AND word = ?",
+                                   (username, word))
+                self._conn.execute("DELETE FROM misses WHERE username = ? AND word = ? AND count <= 0",
+                                   (username, word))
+            else:
+                self._conn.execute(
+                    "INSERT INTO misses (username, word, count) VALUES (?, ?, 1)"
+                    " ON CONFLICT(username, word) DO UPDATE SET count = count + 1",
+                    (username, word)
+                )
+
+    def _write_user(self, username, data):
+        """Caller holds the lock and an open transaction."""
+        incorrect = data.get('incorrect_words', {}) or {}
+        if not isinstance(incorrect, Mapping):
+            incorrect = {}
+        self._conn.execute("INSERT INTO users (username, password) VALUES (?, ?)",
+                           (username, data.get('password', '')))
+        self._conn.execute("INSERT INTO scores (username, score) VALUES (?, ?)",
+                           (username, int(data.get('score', 0) or 0)))
+        misses = [(username, w, _count(c)) for w, c in incorrect.items()]
+        self._conn.executemany("INSERT INTO misses (username, word, count) VALUES (?, ?, ?)",
+                               [m for m in misses if m[2] is not None])
+
+
+def _count(value):
+    """A miss count as an int (coerced like users.csv scores), or None if it can't be read as one."""
+    try:
+        return int(value)
+    except Exception:
+        try:
+            return int(float(value))
+        except Exception:
+            return None
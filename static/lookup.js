@@ -3,12 +3,73 @@ document.addEventListener("DOMContentLoaded", () => {
     const wordInput = document.getElementById("wordInput");
     const loader = document.getElementById("loader");
     const resultBox = document.getElementById("resultBox");
+    const suggestionList = document.getElementById("wordSuggestions");
+    const didYouMean = document.getElementById("didYouMean");
 
     const wordTitle = document.getElementById("wordTitle");
     const meaning = document.getElementById("meaning");
     const synonyms = document.getElementById("synonyms");
     const antonyms = document.getElementById("antonyms");
 
+    // Local suggestions only; never waits on the dictionary API
+    async function fetchSuggestions(query) {
+        try {
+            const response = await fetch(`/lookup/suggest?q=${encodeURIComponent(query)}`);
+            return response.ok ? await response.json() : null;
+        } catch (err) {
+            return null;
+        }
+    }
+
+    // Autocomplete as the user types (debounced)
+    let suggestTimer = null;
+    wordInput.addEventListener("input", () => {
+        clearTimeout(suggestTimer);
+        const query = wordInput.value.trim();
+        if (query.length < 2) {
+            suggestionList.replaceChildren();
+            return;
+        }
+        suggestTimer = setTimeout(async () => {
+            const data = await fetchSuggestions(query);
+            if (!data || data.query !== wordInput.value.trim().toLowerCase()) return;
+            const words = [...new Set([...data.completions, ...data.corrections])];
+            suggestionList.replaceChildren(...words.map(w => {
+                const option = document.createElement("option");
+                option.value = w;
+                return option;
+            }));
+        }, 120);
+    });
+
+    // "Did you mean ...?" with each correction, plus the typed word to search anyway
+    function showCorrections(word, corrections) {
+        didYouMean.replaceChildren();
+        if (!corrections || !corrections.length) {
+            didYouMean.classList.add("hidden");
+            return false;
+        }
+        didYouMean.append("Did you mean: ");
+        corrections.forEach(w => {
+            const button = document.createElement("button");
+            button.type = "button";
+            button.textContent = w;
+            button.addEventListener("click", () => {
+                wordInput.value = w;
+                lookup(w);
+            });
+            didYouMean.append(button);
+        });
+        const anyway = document.createElement("button");
+        anyway.type = "button";
+        anyway.className = "search-anyway";
+        anyway.textContent = `search "${word}" anyway`;
+        anyway.addEventListener("click", () => lookup(word));
+        didYouMean.append(anyway);
+        didYouMean.classList.remove("hidden");
+        return true;
+    }
+
     lookupBtn.addEventListener("click", async (e) => {
         e.preventDefault();
 
@@ -18,34 +79,44 @@ document.addEventListener("DOMContentLoaded", () => {
             return;
         }
 
+        // An unknown word with close known matches is probably a typo: offer those before asking the API
+        const suggestions = await fetchSuggestions(word);
+        if (suggestions && !suggestions.known && showCorrections(word, suggestions.corrections)) {
+            resultBox.classList.add("hidden");
+            return;
+        }
+        lookup(word);
+    });
+
+    async function lookup(word) {
         loader.classList.remove("hidden");
         resultBox.classList.add("hidden");
+        didYouMean.classList.add("hidden");
 
         try {
-            const response = await fetch("/lookup", {
-                method: "POST",
-                headers: { "Content-Type": "application/json" },
-                body: JSON.stringify({ word })
-            });
+            // GET so the browser's HTTP cache can answer repeat lookups (ETag / max-age)
+            const response = await fetch(`/api/lookup/${encodeURIComponent(word.toLowerCase())}`);
 
             const data = await response.json();
             loader.classList.add("hidden");
 
             if (data.error) {
-                alert(data.error);
+                if (!showCorrections(word, data.suggestions)) alert(data.error);
                 return;
             }
 
             // Display result
             resultBox.classList.remove("hidden");
             wordTitle.textContent = data.word.toUpperCase();
-            meaning.textContent = data.meaning || "No definition available.";
-            synonyms.textContent = data.synonyms || "None";
-            antonyms.textContent = data.antonyms || "None";
+            meaning.textContent = data.meanings
+                .map(m => `(${m.partOfSpeech}) ${m.definition}`)
+                .join("\n") || "No definition available.";
+            synonyms.textContent = data.synonyms.slice(0, 10).join(", ") || "None";
+            antonyms.textContent = data.antonyms.slice(0, 10).join(", ") || "None";
 
         } catch (err) {
             loader.classList.add("hidden");
             alert("⚠️ Network error. Please check your connection.");
         }
-    });
+    }
 });
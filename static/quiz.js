@@ -1,13 +1,93 @@
+// Answers are buffered and sent in batches; attemptId + index let the server drop resent answers
+const attemptId = (window.crypto && crypto.randomUUID)
+    ? crypto.randomUUID()
+    : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+const BATCH_SIZE = 5;
+let pendingAnswers = [];
+
+// In streaming mode questions keep arriving over Server-Sent Events while the quiz runs
+let streamDone = !streamNum;
+let waitingForQuestion = false;
+
 document.addEventListener("DOMContentLoaded", () => {
-    if (questions.length > 0) {
+    if (streamNum) {
+        startQuestionStream();
+        showWaiting();
+    } else if (questions.length > 0) {
         loadQuestion();
     }
 });
 
+function startQuestionStream() {
+    const source = new EventSource(`/quiz/stream?num=${streamNum}`);
+
+    source.addEventListener("question", (e) => {
+        questions.push(JSON.parse(e.data));
+        if (waitingForQuestion) {
+            loadQuestion();
+        }
+    });
+
+    const finish = () => {
+        source.close();
+        streamDone = true;
+        if (waitingForQuestion) {
+            loadQuestion();
+        }
+    };
+    source.addEventListener("done", finish);
+    source.onerror = finish;
+}
+
+function showWaiting() {
+    waitingForQuestion = true;
+    document.getElementById('question-text').textContent = "⏳ Loading next question...";
+    document.querySelectorAll('.qz-option').forEach(btn => {
+        btn.style.display = 'none';
+        btn.classList.remove('correct', 'wrong');
+    });
+}
+
+// Don't lose buffered answers if the user leaves mid-quiz
+window.addEventListener("pagehide", () => {
+    if (pendingAnswers.length === 0) return;
+    const body = JSON.stringify({ attempt_id: attemptId, answers: pendingAnswers });
+    navigator.sendBeacon("/quiz/submit_batch", new Blob([body], { type: "application/json" }));
+});
+
+function flushAnswers() {
+    if (pendingAnswers.length === 0) return Promise.resolve();
+
+    const batch = pendingAnswers.slice();
+    return fetch("/quiz/submit_batch", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ attempt_id: attemptId, answers: batch })
+    })
+        .then(res => {
+            if (!res.ok) throw new Error(`HTTP ${res.status}`);
+            // Keep anything answered while this batch was in flight
+            pendingAnswers = pendingAnswers.filter(a => !batch.includes(a));
+        })
+        .catch(err => console.error("Error submitting:", err));
+}
+
 function loadQuestion() {
+    waitingForQuestion = false;
+    if (currentIndex >= questions.length && !streamDone) {
+        showWaiting();
+        return;
+    }
     if (currentIndex >= questions.length) {
-        alert(`🎯 Quiz finished! Your total score: ${userScore}`);
-        window.location.href = "/index";
+        if (questions.length === 0) {
+            alert("⚠ Couldn't build a quiz right now. Please try again.");
+            window.location.href = "/choose_quiz";
+            return;
+        }
+        flushAnswers().then(() => {
+            alert(`🎯 Quiz finished! Your total score: ${userScore}`);
+            window.location.href = "/index";
+        });
         return;
     }
 
@@ -53,18 +133,16 @@ function checkAnswer(clickedButton, chosenAnswer, correctAnswer, word) {
 
     document.getElementById('score-display').textContent = userScore;
 
-    // Send result to backend
-    fetch("/quiz/submit", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({
-            word: word.toLowerCase(),
-            correct: isCorrect
-        })
-    }).catch(err => console.error("Error submitting:", err));
+    // Queue result for the backend
+    pendingAnswers.push({ index: currentIndex, word: word.toLowerCase(), correct: isCorrect });
+    if (pendingAnswers.length >= BATCH_SIZE) {
+        flushAnswers();
+    }
 }
 
 document.querySelector('.qz-next-btn').addEventListener('click', () => {
+    if (waitingForQuestion) return;
+
     const answered = Array.from(document.querySelectorAll('.qz-option'))
         .some(btn => btn.classList.contains('correct') || btn.classList.contains('wrong'));
 
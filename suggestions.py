@@ -0,0 +1,169 @@
+# suggestions.py
+import bisect
+import threading
+
+
+def edit_distance(a, b):
+    """
+    Levenshtein distance, bit-parallel (Myers/Hyyrö): one pass over b with a few
+    integer operations per character, instead of filling a len(a) x len(b) table.
+    """
+    if not a:
+        return len(b)
+    if not b:
+        return len(a)
+    peq = {}
+    for i, c in enumerate(a):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    mask = (1 << len(a)) - 1
+    last = 1 << (len(a) - 1)
+    pv, mv, score = mask, 0, len(a)
+    for c in b:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+    return score
+
+
+def _deletes(word, depth):
+    """word and every string made by removing up to `depth` characters from it."""
+    found = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        found |= frontier
+    return found
+
+
+class SuggestionIndex:
+    """
+    Known words for the lookup page: a sorted array for prefix completion, plus a
+    symmetric-delete index (as in SymSpell) for typo correction.
+
+    Each word is indexed under itself and every string made by deleting up to
+    max_distance characters from it; a query is expanded the same way and looked
+    up there, and the few candidates that come back are checked with edit_distance.
+    Two strings within max_distance edits share such a deletion, so that finds every
+    word within max_distance edits (deletions, insertions and substitutions in
+    any mix; a transposition counts as two), at ~len(word)^max_distance index keys per word.
+
+    With background=True the initial build runs on a thread and queries wait for it.
+    """
+
+    def __init__(self, words=(), max_distance=2, background=False):
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._words = []      # id -> word
+        self._ids = {}        # word -> id
+        self._sorted = []     # all words, sorted, for prefix search
+        self._deleted = {}    # deletion -> word id, or list of ids
+        if background:
+            threading.Thread(target=self._build, args=(words,), name='suggestions-build', daemon=True).start()
+        else:
+            self._build(words)
+
+    def _build(self, words):
+        try:
+            for word in words:
+                self._add(word)
+            self._sorted = sorted(self._words)
+        except Exception as e:
+            print(f"Error building suggestion index: {e}")
+        finally:
+            self._ready.set()
+
+    def _add(self, word):
+        """Indexes word for corrections; returns False if it was already known. Caller holds the lock or is the builder."""
+        word = word.strip().lower()
+        if not word or word in self._ids:
+            return False
+        wid = len(self._words)
+        self._words.append(word)
+        self._ids[word] = wid
+        for key in _deletes(word, self.max_distance):
+            ids = self._deleted.get(key)
+            if ids is None:
+                self._deleted[key] = wid
+            elif type(ids) is int:
+                self._deleted[key] = [ids, wid]
+            else:
+                ids.append(wid)
+        return True
+
+    def add(self, word):
+        """Adds a word found later (e.g. by a successful lookup)."""
+        self._ready.wait()
+        with self._lock:
+            if self._add(word):
+                bisect.insort(self._sorted, self._words[-1])
+
+    def __contains__(self, word):
+        self._ready.wait()
+        return word.strip().lower() in self._ids
+
+    def __len__(self):
+        self._ready.wait()
+        return len(self._words)
+
+    def complete(self, prefix, limit=8):
+        """Up to limit known words starting with prefix, alphabetically."""
+        self._ready.wait()
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        with self._lock:
+            start = bisect.bisect_left(self._sorted, prefix)
+            found = []
+            for word in self._sorted[start:start + limit]:
+                if not word.startswith(prefix):
+                    break
+                found.append(word)
+        return found
+
+    def correct(self, word, limit=8):
+        """Up to limit known words within max_distance edits of word (not word itself), closest first."""
+        self._ready.wait()
+        word = word.strip().lower()
+        if not word:
+            return []
+        candidates = set()
+        with self._lock:
+            for key in _deletes(word, self.max_distance):
+                ids = self._deleted.get(key)
+                if ids is None:
+                    continue
+                if type(ids) is int:
+                    candidates.add(ids)
+                else:
+                    candidates.update(ids)
+            candidates = [self._words[wid] for wid in candidates]
+        ranked = []
+        for candidate in candidates:
+            if candidate == word:
+                continue
+            distance = edit_distance(word, candidate)
+            if distance <= self.max_distance:
+                ranked.append((distance, candidate))
+        ranked.sort()
+        return [candidate for _, candidate in ranked[:limit]]
+
+    def suggest(self, query, limit=8):
+        """What /lookup/suggest returns: completions of query and corrections for it."""
+        query = query.strip().lower()
+        return {
+            'query': query,
+            'known': query in self,
+            'completions': self.complete(query, limit),
+            'corrections': self.correct(query, limit),
+        }
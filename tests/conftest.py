@@ -0,0 +1,7 @@
+# conftest.py
+import os
+import sys
+
+# The app is a flat set of modules run from the repo root; tests import them the same way
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'benchmarks')]
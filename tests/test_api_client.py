@@ -0,0 +1,227 @@
+# test_api_client.py
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import pytest
+
+import api_client
+from circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from fake_dictionary import FakeDictionary, make_entry
+from lookup_cache import LookupCache, MISSING
+
+
+@pytest.fixture
+def fake():
+    server = FakeDictionary()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def client(fake, tmp_path, monkeypatch):
+    """api_client pointed at the fake API, with its own cache file, no retries and a quick breaker."""
+    monkeypatch.setattr(api_client, 'API_URL', fake.url)
+    monkeypatch.setattr(api_client, 'API_RETRIES', 0)
+    monkeypatch.setattr(api_client, 'API_BACKOFF', 0.1)
+    monkeypatch.setattr(api_client, 'CACHE_FETCH_LEASE', 1.0)
+    monkeypatch.setattr(api_client, '_session', api_client._make_session())
+    monkeypatch.setattr(api_client, '_breaker', CircuitBreaker(failure_threshold=2, reset_timeout=0.2))
+    monkeypatch.setattr(api_client, '_store', LookupCache(str(tmp_path / 'cache.sqlite3'), busy_timeout=0.1))
+    monkeypatch.setattr(api_client, '_offline', None)
+    monkeypatch.setattr(api_client, '_cache', OrderedDict())
+    monkeypatch.setattr(api_client, '_async_sessions', {})
+    return api_client
+
+
+def _with_retries(client, monkeypatch, retries):
+    monkeypatch.setattr(client, 'API_RETRIES', retries)
+    monkeypatch.setattr(client, '_session', client._make_session())
+
+
+def _open_breaker(client, fake):
+    fake.fail_next(503, 503)
+    assert client.api_lookup('down1') is None
+    assert client.api_lookup('down2') is None
+    assert client._breaker.state == OPEN
+
+
+# --- Retries ---
+@pytest.mark.parametrize('status', [429, 500, 502, 503, 504])
+def test_retries_with_backoff(client, fake, monkeypatch, status):
+    _with_retries(client, monkeypatch, 2)
+    fake.fail_next(status, status)
+    start = time.monotonic()
+    assert client.api_lookup('apple') == make_entry('apple')
+    assert fake.requests == 3
+    assert time.monotonic() - start >= 0.2  # urllib3 retries at once, then waits 2 x API_BACKOFF
+    assert client._breaker.failures == 0
+
+
+def test_gives_up_after_retries(client, fake, monkeypatch):
+    _with_retries(client, monkeypatch, 1)
+    fake.fail_next(503, 503)
+    assert client.api_lookup('apple') is None
+    assert fake.requests == 2
+    assert client._breaker.failures == 1
+
+
+def test_final_429_counts_as_failure(client, fake):
+    fake.fail_next(429)
+    assert client.api_lookup('apple') is None
+    assert client._breaker.failures == 1
+
+
+def test_async_retries_with_backoff(client, fake, monkeypatch):
+    pytest.importorskip('aiohttp')
+    monkeypatch.setattr(client, 'API_RETRIES', 2)
+    fake.fail_next(429, 503)
+
+    async def lookup():
+        try:
+            return await client.api_lookup_async('apple')
+        finally:
+            await client.close_async_session()
+
+    start = time.monotonic()
+    assert asyncio.run(lookup()) == make_entry('apple')
+    assert fake.requests == 3
+    assert time.monotonic() - start >= 0.3  # API_BACKOFF, then twice that
+
+
+# --- Circuit breaker ---
+def test_breaker_opens_and_fails_fast(client, fake):
+    _open_breaker(client, fake)
+    requests = fake.requests
+    assert client.api_lookup('apple') is None
+    assert fake.requests == requests  # rejected without calling the API
+    assert client._breaker.rejected == 1
+
+
+def test_breaker_serves_stale_entries_while_open(client, fake, monkeypatch):
+    assert client.api_lookup('apple') == make_entry('apple')
+    monkeypatch.setattr(client._store, 'ttl', 0)
+    client._cache.clear()
+    _open_breaker(client, fake)
+    requests = fake.requests
+    assert client.api_lookup('apple') == make_entry('apple')
+    assert fake.requests == requests
+
+
+def test_half_open_trial_closes_breaker(client, fake):
+    _open_breaker(client, fake)
+    time.sleep(0.25)
+    assert client.api_lookup('apple') == make_entry('apple')
+    assert client._breaker.state == CLOSED
+
+
+def test_failed_half_open_trial_reopens_breaker(client, fake):
+    _open_breaker(client, fake)
+    time.sleep(0.25)
+    fake.fail_next(503)
+    assert client.api_lookup('apple') is None
+    assert client._breaker.state == OPEN
+
+
+def test_trial_released_when_fetch_raises(client, fake, monkeypatch):
+    _open_breaker(client, fake)
+    time.sleep(0.25)
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(client._session, 'get', broken)
+    with pytest.raises(RuntimeError):
+        client.api_lookup('apple')
+    assert client._breaker.state == HALF_OPEN
+    assert client._breaker.allow()  # the trial is free again
+
+
+def test_waiting_on_another_worker_keeps_trial_free(client, fake):
+    """A lookup answered by another process's fetch never takes the half-open trial."""
+    _open_breaker(client, fake)
+    time.sleep(0.25)
+    store = client._store
+    store._conn.execute("INSERT INTO fetching (word, owner, claimed_at) VALUES ('shared', -1, ?)", (time.time(),))
+    store._conn.commit()
+
+    def other_worker():
+        time.sleep(0.1)
+        store.put('shared', make_entry('shared'))
+        with store._lock:
+            store._conn.execute("DELETE FROM fetching WHERE word = 'shared'")
+            store._conn.commit()
+    worker = threading.Thread(target=other_worker)
+    worker.start()
+    requests = fake.requests
+    assert client.api_lookup('shared') == make_entry('shared')
+    worker.join()
+    assert fake.requests == requests
+
+    assert client.api_lookup('apple') == make_entry('apple')  # the trial call
+    assert client._breaker.state == CLOSED
+
+
+# --- Caching ---
+def test_not_found_is_cached(client, fake):
+    assert client.api_lookup('missingword') is None
+    assert client.not_found('missingword')
+    assert client.api_lookup('missingword') is None
+    assert fake.requests == 1
+
+
+def test_found_entry_is_cached(client, fake):
+    assert client.api_lookup('apple') == make_entry('apple')
+    client._cache.clear()  # skip the in-memory LRU, read the cache file
+    assert client.api_lookup('apple') == make_entry('apple')
+    assert fake.requests == 1
+
+
+def test_expired_entries_are_fetched_again(client, fake, monkeypatch):
+    assert client.api_lookup('apple') is not None
+    assert client.api_lookup('missingword') is None
+    client._cache.clear()
+    monkeypatch.setattr(client._store, 'ttl', 0)
+    monkeypatch.setattr(client._store, 'negative_ttl', 0)
+    time.sleep(0.01)
+    assert client.api_lookup('apple') is not None
+    assert client.api_lookup('missingword') is None
+    assert fake.requests == 4
+
+
+def test_lookup_cache_ttl(tmp_path):
+    cache = LookupCache(str(tmp_path / 'cache.sqlite3'), ttl=0.2, negative_ttl=0.1)
+    cache.put('apple', {'word': 'apple'})
+    cache.put('missingword', None)
+    assert cache.get('apple') == {'word': 'apple'}
+    assert cache.get('missingword') is None
+    assert cache.is_not_found('missingword')
+    time.sleep(0.15)
+    assert cache.get('missingword') is MISSING  # negative entries expire first
+    assert not cache.is_not_found('missingword')
+    assert cache.get('apple') == {'word': 'apple'}
+    time.sleep(0.1)
+    assert cache.get('apple') is MISSING
+    assert cache.get('apple', allow_stale=True) == {'word': 'apple'}
+
+
+def test_lookup_cache_evicts_least_recently_used(tmp_path):
+    cache = LookupCache(str(tmp_path / 'cache.sqlite3'), max_entries=2)
+    cache.put('a', {'word': 'a'})
+    cache.put('b', {'word': 'b'})
+    cache.put('c', {'word': 'c'})
+    assert cache.get('a') is MISSING
+    assert cache.get('c') == {'word': 'c'}
+
+
+def test_locked_cache_falls_back_to_unclaimed_fetch(client, fake, tmp_path):
+    other = sqlite3.connect(str(tmp_path / 'cache.sqlite3'), timeout=0)
+    other.execute("BEGIN IMMEDIATE")  # another worker holding the write lock
+    try:
+        assert client.api_lookup('apple') == make_entry('apple')
+    finally:
+        other.rollback()
+        other.close()
+    assert fake.requests == 1
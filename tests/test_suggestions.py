@@ -0,0 +1,84 @@
+# test_suggestions.py
+import random
+
+import pytest
+
+from suggestions import SuggestionIndex, edit_distance
+
+WORDS = ['abundant', 'benevolent', 'candid', 'diligent', 'eloquent', 'frugal', 'gregarious',
+         'hinder', 'impartial', 'jubilant', 'keen', 'lucid', 'meticulous', 'nostalgia',
+         'obscure', 'pragmatic', 'quaint', 'resilient', 'scrutinize', 'tenacious']
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def _delete(word, rng):
+    i = rng.randrange(len(word))
+    return word[:i] + word[i + 1:]
+
+
+def _insert(word, rng):
+    i = rng.randrange(len(word) + 1)
+    return word[:i] + rng.choice(LETTERS) + word[i:]
+
+
+def _substitute(word, rng):
+    i = rng.randrange(len(word))
+    return word[:i] + rng.choice(LETTERS.replace(word[i], '')) + word[i + 1:]
+
+
+def _transpose(word, rng):
+    i = rng.randrange(len(word) - 1)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def _twice(first, second):
+    def typo(word, rng):
+        return second(first(word, rng), rng)
+    return typo
+
+
+EDITS = {'delete': _delete, 'insert': _insert, 'substitute': _substitute}
+# Every pair of single edits, plus a transposition (two edits in Levenshtein distance)
+TWO_EDITS = {f"{a}+{b}": _twice(EDITS[a], EDITS[b]) for a in EDITS for b in EDITS if a <= b}
+TWO_EDITS['transpose'] = _transpose
+
+
+@pytest.fixture(scope='module')
+def index():
+    return SuggestionIndex(WORDS, max_distance=2)
+
+
+def test_edit_distance():
+    assert edit_distance('kitten', 'sitting') == 3
+    assert edit_distance('', 'abc') == 3
+    assert edit_distance('lucid', 'lucid') == 0
+
+
+@pytest.mark.parametrize('kind', sorted(TWO_EDITS))
+def test_corrects_every_two_edit_typo(index, kind):
+    rng = random.Random(kind)
+    for word in WORDS:
+        for _ in range(5):
+            typo = TWO_EDITS[kind](word, rng)
+            if typo == word or typo in index:
+                continue
+            assert word in index.correct(typo, limit=len(WORDS)), (kind, word, typo)
+
+
+def test_closest_first_and_within_distance(index):
+    assert index.correct('lucud')[0] == 'lucid'
+    assert index.correct('zzzzzz') == []
+    assert 'lucid' not in index.correct('lucid')
+
+
+def test_one_edit_index():
+    index = SuggestionIndex(WORDS, max_distance=1)
+    assert index.correct('frugl') == ['frugal']
+    assert index.correct('frgl') == []
+
+
+def test_complete_and_add(index):
+    assert index.complete('re') == ['resilient']
+    index.add('Relish')
+    assert index.complete('re') == ['relish', 'resilient']
+    assert 'relish' in index.correct('relsh')
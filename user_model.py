@@ -0,0 +1,180 @@
+# user_model.py
+import sys
+import threading
+from array import array
+from collections.abc import Mapping, MutableMapping
+
+
+class WordTable:
+    """
+    Process-wide intern table mapping words to small integer ids. Quiz words from
+    words.csv are added first (see data_manager.load_users); any other word gets
+    the next id the first time it is seen, so every string round-trips unchanged.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._words = []
+        self._lock = threading.Lock()
+
+    def id_for(self, word):
+        """Returns the word's id, assigning a new one if needed."""
+        wid = self._ids.get(word)
+        if wid is None:
+            with self._lock:
+                wid = self._ids.get(word)
+                if wid is None:
+                    word = sys.intern(word)
+                    wid = len(self._words)
+                    self._words.append(word)
+                    self._ids[word] = wid
+        return wid
+
+    def find(self, word):
+        """Returns the word's id, or None if it has never been seen."""
+        return self._ids.get(word)
+
+    def word(self, wid):
+        return self._words[wid]
+
+    def extend(self, words):
+        for word in words:
+            self.id_for(word)
+
+    def __len__(self):
+        return len(self._words)
+
+
+WORDS = WordTable()
+
+
+class MissCounts(MutableMapping):
+    """
+    A user's {word: miss count}, stored as two packed arrays (word ids and counts)
+    instead of a dict holding its own copy of every word string. Behaves like the
+    dict it replaces and keeps insertion order; lookups are a C-level scan of the
+    id array, which is cheap at the few dozen words a user typically misses.
+    """
+    __slots__ = ('_ids', '_counts')
+
+    def __init__(self, items=()):
+        if isinstance(items, dict):
+            # Bulk path for loading: a dict can't repeat a word, so no per-key lookups
+            id_for = WORDS.id_for
+            self._ids = array('I', [id_for(word) for word in items])
+            self._counts = array('i', items.values())
+        else:
+            self._ids = array('I')
+            self._counts = array('i')
+            self.update(items)
+
+    def _index(self, word):
+        wid = WORDS.find(word)
+        if wid is None:
+            return -1
+        try:
+            return self._ids.index(wid)
+        except ValueError:
+            return -1
+
+    def __getitem__(self, word):
+        i = self._index(word)
+        if i < 0:
+            raise KeyError(word)
+        return self._counts[i]
+
+    def __setitem__(self, word, count):
+        i = self._index(word)
+        if i < 0:
+            self._ids.append(WORDS.id_for(word))
+            self._counts.append(count)
+        else:
+            self._counts[i] = count
+
+    def __delitem__(self, word):
+        i = self._index(word)
+        if i < 0:
+            raise KeyError(word)
+        del self._ids[i]
+        del self._counts[i]
+
+    def __contains__(self, word):
+        return self._index(word) >= 0
+
+    def __iter__(self):
+        return iter([WORDS.word(wid) for wid in self._ids])
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __repr__(self):
+        return f"MissCounts({self.to_dict()!r})"
+
+    def to_dict(self):
+        return {WORDS.word(wid): count for wid, count in zip(self._ids, self._counts)}
+
+    def arrays(self):
+        """The packed (word ids, counts) arrays themselves, for bulk readers such as difficulty.py. Don't modify."""
+        return self._ids, self._counts
+
+
+def compact_misses(incorrect_words):
+    """
+    Packs a {word: count} dict into MissCounts. Anything that doesn't fit the packed
+    form (non-integer or out-of-range counts from a hand-edited file) is kept as the
+    plain dict so saving it again writes exactly what was loaded.
+    """
+    if isinstance(incorrect_words, MissCounts):
+        return incorrect_words
+    if not incorrect_words:
+        return MissCounts()
+    try:
+        if all(type(c) is int for c in incorrect_words.values()):
+            return MissCounts(incorrect_words)
+    except OverflowError:
+        pass
+    return dict(incorrect_words)
+
+
+class User(Mapping):
+    """
+    One user record. Reads and writes like the old {'password', 'score',
+    'incorrect_words'} dict (user['score'] += 5, user.get(...), dict(user)),
+    but uses __slots__ and packed miss counts instead of a dict per user.
+    """
+    __slots__ = ('password', 'score', 'incorrect_words')
+    FIELDS = ('password', 'score', 'incorrect_words')
+
+    def __init__(self, password='', score=0, incorrect_words=None):
+        self.password = password
+        self.score = score
+        self.incorrect_words = compact_misses(incorrect_words)
+
+    def __getitem__(self, key):
+        if key not in User.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in User.FIELDS:
+            raise KeyError(key)
+        if key == 'incorrect_words':
+            value = compact_misses(value)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in User.FIELDS
+
+    def __iter__(self):
+        return iter(User.FIELDS)
+
+    def __len__(self):
+        return len(User.FIELDS)
+
+    def __repr__(self):
+        return f"User({self.to_dict()!r})"
+
+    def to_dict(self):
+        """The plain-dict form used by users.csv, the SQLite store and JSON responses."""
+        return {'password': self.password, 'score': self.score,
+                'incorrect_words': dict(self.incorrect_words)}
@@ -0,0 +1,269 @@
+# user_snapshot.py
+import json
+import mmap
+import os
+import struct
+import threading
+from collections.abc import MutableMapping
+
+from slot_table import SlotTable, pack_slots
+from user_model import User
+
+# File layout (little-endian):
+#   header   MAGIC, user count, offsets of the order table, key region and record region
+#   slots    one slot per user, sorted by the username's UTF-8 bytes (see slot_table.py)
+#   order    slot numbers in the original users.csv order, so saving keeps the row order
+#   keys     the usernames, back to back
+#   records  score, password and miss counts per user (see _encode)
+MAGIC = b'VOCUSR01'
+HEADER = struct.Struct('<8sIQQQ')
+ORDER = struct.Struct('<I')
+RECORD_HEAD = struct.Struct('<qBI')   # score, misses format (0 packed, 1 JSON), password length
+MISSES_PACKED = struct.Struct('<I')   # number of (word, count) pairs that follow
+MISS = struct.Struct('<Hi')           # word length (word bytes follow), count
+MISSES_JSON = struct.Struct('<I')     # JSON length (bytes follow)
+
+
+def _encode(data):
+    """Packs one user (a User or a users.csv-style dict) into record bytes."""
+    password = str(data.get('password', '')).encode('utf-8')
+    incorrect = data.get('incorrect_words') or {}
+    score = int(data.get('score', 0) or 0)
+    misses = None
+    if all(type(c) is int for c in incorrect.values()):
+        try:
+            misses = bytearray(MISSES_PACKED.pack(len(incorrect)))
+            for word, count in incorrect.items():
+                word = word.encode('utf-8')
+                misses += MISS.pack(len(word), count)
+                misses += word
+        except struct.error:
+            misses = None  # count or word too large for the packed form
+    if misses is None:
+        text = json.dumps(dict(incorrect), ensure_ascii=False).encode('utf-8')
+        misses = MISSES_JSON.pack(len(text)) + text
+    return RECORD_HEAD.pack(score, 0 if isinstance(misses, bytearray) else 1, len(password)) + password + bytes(misses)
+
+
+def write_snapshot(path, users):
+    """
+    Writes users to a snapshot file (temp file + rename; readers that already
+    mapped the old file keep a consistent view). Raises on values the format
+    can't hold (e.g. a score outside 64 bits); callers fall back to users.csv.
+    """
+    names = list(users)
+    encoded = [(name.encode('utf-8'), _encode(users[name])) for name in names]
+    by_key = sorted(range(len(encoded)), key=lambda i: encoded[i][0])
+    slot_of = [0] * len(encoded)
+    for slot, i in enumerate(by_key):
+        slot_of[i] = slot
+    slots, key_region, record_region = pack_slots(encoded[i] for i in by_key)
+    order = b''.join(ORDER.pack(slot) for slot in slot_of)
+
+    order_at = HEADER.size + len(slots)
+    keys_at = order_at + len(order)
+    records_at = keys_at + len(key_region)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, mode='wb') as file:
+        file.write(HEADER.pack(MAGIC, len(encoded), order_at, keys_at, records_at))
+        file.write(slots)
+        file.write(order)
+        file.write(key_region)
+        file.write(record_region)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+class UserSnapshot:
+    """
+    Read-only, memory-mapped user snapshot. Opening it reads only the header;
+    a user is found by binary search over the sorted slot table and decoded on
+    demand, so startup time doesn't depend on how many users there are.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, mode='rb') as file:
+            self._mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self._order_at, self._keys_at, self._records_at = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not a user snapshot")
+        self._table = SlotTable(self._mm, self.count, HEADER.size, self._keys_at)
+
+    def find(self, username):
+        """Returns the user's slot, or None if the snapshot doesn't have them."""
+        return self._table.find(username.encode('utf-8'))
+
+    def get(self, username):
+        """Decodes one user into a User, or returns None."""
+        slot = self.find(username)
+        return self._decode(slot) if slot else None
+
+    def score(self, slot):
+        return RECORD_HEAD.unpack_from(self._mm, self._records_at + slot[2])[0]
+
+    def entries(self):
+        """Yields (username, slot) in the original users.csv order."""
+        for i in range(self.count):
+            slot = self._table.slot(ORDER.unpack_from(self._mm, self._order_at + i * ORDER.size)[0])
+            yield self._table.key(slot).decode('utf-8'), slot
+
+    def _decode(self, slot):
+        mm = self._mm
+        pos = self._records_at + slot[2]
+        score, misses_format, password_len = RECORD_HEAD.unpack_from(mm, pos)
+        pos += RECORD_HEAD.size
+        password = mm[pos:pos + password_len].decode('utf-8')
+        pos += password_len
+        if misses_format == 1:
+            (length,) = MISSES_JSON.unpack_from(mm, pos)
+            pos += MISSES_JSON.size
+            return User(password, score, json.loads(mm[pos:pos + length]))
+        (count,) = MISSES_PACKED.unpack_from(mm, pos)
+        pos += MISSES_PACKED.size
+        misses = {}
+        for _ in range(count):
+            word_len, miss_count = MISS.unpack_from(mm, pos)
+            pos += MISS.size
+            misses[mm[pos:pos + word_len].decode('utf-8')] = miss_count
+            pos += word_len
+        return User(password, score, misses)
+
+    def close(self):
+        self._mm.close()
+
+
+class LazyUsers(MutableMapping):
+    """
+    The users dict, backed by a UserSnapshot. A user is decoded the first time
+    they're looked up and kept from then on (changes are made to that copy);
+    users added later live only in memory until the next save.
+
+    items() and values() don't keep what they decode: users never looked up come
+    back as fresh copies, so edit users through users[name], not while iterating.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self._loaded = {}
+        self._deleted = set()
+        self._added = 0   # loaded users that aren't in the snapshot
+        self._lock = threading.Lock()
+
+    def __getitem__(self, username):
+        user = self._loaded.get(username)
+        if user is None:
+            with self._lock:
+                user = self._loaded.get(username)
+                if user is None:
+                    user = self.snapshot.get(username) if username not in self._deleted else None
+                    if user is None:
+                        raise KeyError(username)
+                    self._loaded[username] = user
+        return user
+
+    def get(self, username, default=None):
+        try:
+            return self[username]
+        except KeyError:
+            return default
+
+    def loaded(self, username):
+        """The user's in-memory copy if they have been looked up (or added) since the snapshot, else None."""
+        return self._loaded.get(username)
+
+    def __setitem__(self, username, user):
+        with self._lock:
+            # Re-adding a deleted snapshot user just undoes the delete; only brand-new names count as added
+            if username not in self._loaded and username not in self._deleted and not self.snapshot.find(username):
+                self._added += 1
+            self._deleted.discard(username)
+            self._loaded[username] = user
+
+    def __delitem__(self, username):
+        with self._lock:
+            in_snapshot = self.snapshot.find(username) is not None
+            if username not in self._loaded and (not in_snapshot or username in self._deleted):
+                raise KeyError(username)
+            self._loaded.pop(username, None)
+            if in_snapshot:
+                self._deleted.add(username)
+            else:
+                self._added -= 1
+
+    def __contains__(self, username):
+        if username in self._loaded:
+            return True
+        return username not in self._deleted and self.snapshot.find(username) is not None
+
+    def __len__(self):
+        return self.snapshot.count - len(self._deleted) + self._added
+
+    def __iter__(self):
+        for username, _ in self._iter_slots():
+            yield username
+
+    def _iter_slots(self):
+        """(username, slot or None) for every user: snapshot order first, then users added since."""
+        loaded = dict(self._loaded)
+        deleted = set(self._deleted)
+        for username, slot in self.snapshot.entries():
+            if username not in deleted:
+                loaded.pop(username, None)
+                yield username, slot
+        for username in loaded:
+            yield username, None
+
+    def items(self):
+        for username, slot in self._iter_slots():
+            user = self._loaded.get(username)
+            yield username, user if user is not None else self.snapshot._decode(slot)
+
+    def values(self):
+        for _, user in self.items():
+            yield user
+
+    def scores(self):
+        """Yields (username, score) without decoding users that haven't been loaded."""
+        for username, slot in self._iter_slots():
+            user = self._loaded.get(username)
+            yield username, user['score'] if user is not None else self.snapshot.score(slot)
+
+
+def open_snapshot(path, source_path):
+    """
+    Returns the snapshot at path as LazyUsers, or None if it is missing, unreadable,
+    or older than source_path (users.csv was changed after the snapshot was written).
+    """
+    try:
+        if os.stat(source_path).st_mtime_ns > os.stat(path).st_mtime_ns:
+            return None
+        return LazyUsers(UserSnapshot(path))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠ Could not open user snapshot '{path}': {e}")
+        return None
+
+
+def user_items(users):
+    """
+    (username, user) pairs for any users mapping, without loading LazyUsers into memory.
+    Safe to consume on another thread while users are being added.
+    """
+    if isinstance(users, LazyUsers):
+        return users.items()
+    return ((u, users[u]) for u in list(users))
+
+
+def user_scores(users):
+    """
+    (username, score) pairs for any users mapping, cheaply for LazyUsers. Safe to
+    consume on another thread while users are being added.
+    """
+    if isinstance(users, LazyUsers):
+        return users.scores()
+    return [(u, d.get('score', 0)) for u, d in list(users.items())]
+
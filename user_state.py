@@ -0,0 +1,198 @@
+# user_state.py
+import atexit
+import signal
+import sys
+import threading
+import time
+
+from config import USER_FLUSH_INTERVAL, USER_FLUSH_THRESHOLD, JOURNAL_FSYNC_INTERVAL
+from data_manager import apply_answer, save_users
+from user_model import User
+from metrics import STORE_SAVE
+
+
+class UserState:
+    """
+    Authoritative in-memory user dict with dirty tracking. Requests only change
+    memory (plus a buffered journal append for the CSV store); a background thread
+    flushes every USER_FLUSH_INTERVAL seconds, or sooner once USER_FLUSH_THRESHOLD
+    users are dirty. close() flushes whatever is left and runs at interpreter exit
+    and on SIGTERM.
+
+    Store behaviour on flush:
+      - SQLite: one transaction applying the answers recorded since the last flush
+        as per-row updates; only new users and users changed in place are written whole.
+      - CSV: the answer journal is fsynced, which makes the changes durable. The
+        journal is folded into a users.csv snapshot of every user (the format can't
+        update rows in place) only once it is due (AnswerJournal.needs_compact) and
+        on close, and the snapshot is written without blocking answers.
+    """
+
+    def __init__(self, users, journal=None, store=None,
+                 interval=USER_FLUSH_INTERVAL, threshold=USER_FLUSH_THRESHOLD):
+        self.users = users
+        self.journal = journal
+        self.store = store
+        self.interval = interval
+        self.threshold = threshold
+        self.flushes = 0
+        self.on_flush = []  # callables run after each flush (e.g. saving side files like the review queue)
+        self.on_answers = []  # callables run as hook(username, {word: (misses before, misses after)}) under the lock
+
+        self._dirty = set()
+        self._rewrite = set()  # SQLite: users to write whole (new, or changed in place)
+        self._pending = {}     # SQLite: username -> answers not yet applied to the store
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()  # one flush at a time (thread, close(), explicit calls)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._last_flush = time.time()
+        self._thread = threading.Thread(target=self._run, name='user-state-flush', daemon=True)
+        self._thread.start()
+
+        atexit.register(self.close)
+        if threading.current_thread() is threading.main_thread() \
+                and signal.getsignal(signal.SIGTERM) is signal.SIG_DFL:
+            # Turn SIGTERM into a normal exit so atexit (and the final flush) runs
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    @property
+    def lock(self):
+        """Held while answers are applied and the on_answers hooks run."""
+        return self._lock
+
+    @property
+    def dirty_count(self):
+        return len(self._dirty)
+
+    def add_user(self, username, password):
+        """Registers a new user in memory. Returns False if the name is taken."""
+        with self._lock:
+            if username in self.users:
+                return False
+            if self.journal:
+                self.journal.record_user(self.users, username, password)
+            else:
+                self.users[username] = User(password)
+            self._mark(username, rewrite=True)
+            return True
+
+    def record_answers(self, username, answers):
+        """
+        Applies a list of (word, is_correct) answers in memory. Returns the updated user.
+        The on_answers hooks see each answered word's miss count before and after, read
+        under the same lock, so concurrent answers for a user can't skew them.
+        """
+        with self._lock:
+            before = self._miss_counts(username, answers) if self.on_answers else None
+            if self.journal:
+                user = self.journal.record_many(self.users, username, answers)
+                if self.journal.needs_sync():
+                    self._wake.set()
+            else:
+                user = self.users.get(username)
+                for word, is_correct in answers:
+                    user = apply_answer(self.users, username, word, is_correct)
+                if self.store and answers:
+                    self._pending.setdefault(username, []).extend(answers)
+            if answers:
+                self._mark(username)
+                if before is not None:
+                    after = self._miss_counts(username, answers)
+                    changes = {word: (count, after[word]) for word, count in before.items()}
+                    for hook in self.on_answers:
+                        hook(username, changes)
+            return user
+
+    def _miss_counts(self, username, answers):
+        """{word: the user's current miss count} for the answered words. Caller holds the lock."""
+        user = self.users.get(username)
+        missed = (user.get('incorrect_words') or {}) if user else {}
+        return {word: missed.get(word, 0) for word, _ in answers}
+
+    def mark_dirty(self, username):
+        """Call after changing a user dict in place; the whole user is written on the next flush."""
+        with self._lock:
+            self._mark(username, rewrite=True)
+
+    def flush(self, compact=False):
+        """
+        Writes dirty users to the store now. Safe to call from any thread. With the
+        journal, compact=True folds it into users.csv even if that isn't due yet.
+        """
+        with self._flush_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+                if self.store:
+                    rewrite, self._rewrite = self._rewrite, set()
+                    pending, self._pending = self._pending, {}
+                    records = {u: dict(self.users[u], incorrect_words=dict(self.users[u]['incorrect_words']))
+                               for u in rewrite if u in self.users}
+                    # A user written whole already includes its pending answers
+                    answers = {u: a for u, a in pending.items() if u not in records}
+            if self.journal:
+                self.journal.sync()  # journaled changes are durable from here on
+                if compact or self.journal.needs_compact():
+                    self.journal.compact(self.users)  # on failure the journal is kept and replayed
+            elif not dirty:
+                return
+            elif self.store:
+                if not self._save_changes(records, answers):
+                    with self._lock:  # retry on the next flush, older answers first
+                        self._dirty |= dirty
+                        self._rewrite |= records.keys()
+                        for username, user_answers in answers.items():
+                            self._pending[username] = user_answers + self._pending.get(username, [])
+            elif not save_users(self.users):
+                with self._lock:
+                    self._dirty |= dirty  # retry on the next flush
+            self._last_flush = time.time()
+            self.flushes += 1
+            for hook in self.on_flush:
+                hook()
+
+    def close(self):
+        """Stops the flush thread and writes everything still pending."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self.flush(compact=True)
+        if self.journal:
+            self.journal.close()
+
+    def _mark(self, username, rewrite=False):
+        """Caller holds the lock."""
+        self._dirty.add(username)
+        if rewrite and self.store:
+            self._rewrite.add(username)
+        if len(self._dirty) >= self.threshold:
+            self._wake.set()
+
+    def _save_changes(self, records, answers):
+        try:
+            with STORE_SAVE.time(target='sqlite_dirty_users'):
+                self.store.save_changes(records, answers)
+            return True
+        except Exception as e:
+            print(f"Error saving users: {e}")
+            return False
+
+    def _run(self):
+        tick = min(self.interval, JOURNAL_FSYNC_INTERVAL) if self.journal else self.interval
+        while not self._stop.is_set():
+            self._wake.wait(timeout=tick)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                if self.journal and self.journal.unsynced:
+                    self.journal.sync()
+                if self._dirty and (len(self._dirty) >= self.threshold
+                                    or time.time() - self._last_flush >= self.interval):
+                    self.flush()
+                elif self.journal and self.journal.needs_compact():
+                    self.flush()
+            except Exception as e:
+                print(f"Error flushing user state: {e}")
@@ -1,20 +1,104 @@
+import asyncio
 import random
-from collections import defaultdict
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
 import time
 
 # Import external modules
-from config import QUIZ_OPTIONS
-from data_manager import load_common_words, load_users, save_users
-from api_client import api_lookup
+from config import (QUIZ_OPTIONS, QUIZ_LOOKUP_WORKERS, QUIZ_DEADLINE, QUIZ_ATTEMPTS_REMEMBERED,
+                    SUGGEST_MAX_DISTANCE, WORDS_FILE)
+from data_manager import load_common_words, words_mtime, load_users, user_store
+from api_client import api_lookup, api_lookup_async, cached_lookup, entry_time, known_words, not_found
+from lookup_result import LookupResult
+from question_bank import QuestionBank
+from distractors import DistractorIndex
+from quiz_words import QuizWords, USABLE, NO_RELATIONS, NOT_FOUND
+from answer_journal import AnswerJournal
+from leaderboard import Leaderboard
+from user_state import UserState
+from user_snapshot import user_scores
+from review_queue import ReviewQueue
+from suggestions import SuggestionIndex
+from difficulty import DifficultyIndex
+from metrics import QUIZ_LOOKUPS, QUIZ_QUESTIONS
 
 class VocabularyBot:
     def __init__(self): 
         """Initialize bot and load user data + words."""
         self.users = load_users()
+        self.store = user_store()  # None when users live in users.csv
+        self._attempts_lock = threading.Lock()
+        self._attempts = OrderedDict()  # (username, attempt_id) -> answer indexes already applied
+        # The CSV store journals changes between snapshots; SQLite gets dirty users directly
+        self.journal = None if self.store else AnswerJournal()
+        if self.journal:
+            self.journal.recover(self.users)  # Replay answers journaled after the last snapshot
+        # Requests change memory only; a background thread writes dirty users
+        self.state = UserState(self.users, journal=self.journal, store=self.store)
+        # Kept sorted as scores change; built on a background thread so startup doesn't wait for it
+        self.leaderboard = Leaderboard(scores=user_scores(self.users), background=True)
+        self.reviews = ReviewQueue(self.users)  # When each missed word is next due for review
+        self.difficulty = DifficultyIndex(self.users, background=True, lock=self.state.lock)  # Misses per word across all users
+        self.state.on_flush.append(self.reviews.save_if_dirty)
+        self.state.on_answers.append(self.difficulty.record)
         self.current_user = None
-        self.common_words = load_common_words()
-        if not self.common_words:
-            print("\n⚠ Warning: No words found in 'words.csv'. The quiz may not work until you add words.\n")
+        self._common_words = None  # words.csv and the indexes over it are built on first use
+        self._distractors = None
+        self._quiz_words = None
+        self._words_mtime = None   # reloaded when words.csv changes
+        self._words_lock = threading.Lock()
+        self.bank = QuestionBank()  # offline synonym/antonym sets, filled as words are looked up
+        # Autocomplete and typo corrections for lookups; built in the background, grows with each lookup
+        self.suggestions = SuggestionIndex(self._suggestion_words(), max_distance=SUGGEST_MAX_DISTANCE,
+                                           background=True)
+
+    @property
+    def common_words(self):
+        self._check_words()
+        return self._common_words
+
+    @property
+    def distractors(self):
+        if self._distractors is None:
+            self._check_words()
+        return self._distractors
+
+    @property
+    def quiz_words(self):
+        """Quiz vocabulary minus words known to be unusable (see quiz_words.py)."""
+        self._check_words()
+        return self._quiz_words
+
+    def _check_words(self):
+        """Loads words.csv on first use, and again whenever its mtime changes, updating the indexes in place."""
+        mtime = words_mtime()
+        if self._common_words is not None and mtime == self._words_mtime:
+            return
+        with self._words_lock:
+            if self._common_words is not None and mtime == self._words_mtime:
+                return
+            words = load_common_words()
+            if self._common_words is None:
+                if not words:
+                    print("\n⚠ Warning: No words found in 'words.csv'. The quiz may not work until you add words.\n")
+                self._distractors = DistractorIndex(words)  # built once, sampled per question
+                self._quiz_words = QuizWords(words)
+            else:
+                added, removed = self._quiz_words.set_words(words)
+                for word in removed:
+                    self._distractors.remove(word)
+                for word in added:
+                    self._distractors.add(word)
+                print(f"🔄 Reloaded {WORDS_FILE}: {len(added)} words added, {len(removed)} removed.")
+            self._words_mtime = mtime
+            self._common_words = words
+
+    def _suggestion_words(self):
+        """Every word the app knows locally: words.csv, the lookup cache and the question bank."""
+        yield from self.common_words
+        yield from known_words()
+        yield from list(self.bank.entries)
 
     # --- Authentication ---
     def register(self):
@@ -31,8 +115,7 @@ class VocabularyBot:
             if not password:
                 print("Password cannot be empty.")
                 continue
-            self.users[username] = {'password': password, 'score': 0, 'incorrect_words': {}}
-            save_users(self.users)
+            self.add_user(username, password)
             print(f"\n Registration successful! Welcome, {username}.")
             self.current_user = username
             return True
@@ -48,88 +131,296 @@ class VocabularyBot:
         print(" Invalid username or password.")
         return False
 
+    def save(self):
+        """Writes pending user changes to the store now instead of waiting for the flush thread."""
+        self.state.flush()
+
+    def add_user(self, username, password):
+        """Registers a new user. Returns False if the username is taken."""
+        if not self.state.add_user(username, password):
+            return False
+        self.leaderboard.update(username, 0)
+        return True
+
+    def record_answer(self, username, word, is_correct):
+        """Applies one quiz answer in memory; it is persisted by the next flush."""
+        user, _ = self.record_answers(username, [(word, is_correct)])
+        return user
+
+    def record_answers(self, username, answers, attempt_id=None):
+        """
+        Applies a list of (word, is_correct) answers in memory (persisted by the next flush).
+        With an attempt_id, answers is a list of (index, word, is_correct) and indexes already
+        applied for that attempt are skipped, so a retried batch never counts twice.
+        Returns (user, number of answers applied).
+        """
+        if attempt_id is not None:
+            with self._attempts_lock:
+                key = (username, attempt_id)
+                seen = self._attempts.pop(key, set())
+                fresh = [(i, w, c) for i, w, c in answers if i not in seen]
+                seen.update(i for i, _, _ in fresh)
+                self._attempts[key] = seen
+                while len(self._attempts) > QUIZ_ATTEMPTS_REMEMBERED:
+                    self._attempts.popitem(last=False)
+            answers = [(w, c) for _, w, c in fresh]
+
+        user = self.state.record_answers(username, answers)
+        if user:
+            self.leaderboard.update(username, user['score'])
+            for word, is_correct in answers:
+                self.reviews.record(username, word, is_correct)
+        return user, len(answers)
+
     # --- Quiz ---
     def create_quiz(self, num_questions):
         if not self.common_words:
             print("No words found in words.csv.")
             return []
         print(f"\nGenerating a {num_questions}-question quiz...")
-        quiz = []
-        # Get enough words to try to make the quiz
-        random_words = random.sample(self.common_words, k=min(len(self.common_words), num_questions * 2))
+        quiz = list(self.iter_quiz(num_questions))
+        print(f"Quiz generated with {len(quiz)} questions.")
+        return quiz
 
-        for word in random_words:
-            if len(quiz) >= num_questions:
-                break
-            
-            data = api_lookup(word) # Use imported api_lookup
-            if not data:
-                continue
-            
-            meanings = data.get('meanings', [])
-            synonyms = set(s.lower() for m in meanings for s in m.get('synonyms', []))
-            antonyms = set(a.lower() for m in meanings for a in m.get('antonyms', []))
-            
-            # Check for sufficient content to make a question
-            if not synonyms and not antonyms:
-                continue
+    def iter_quiz(self, num_questions):
+        """
+        Yields quiz questions as soon as each one is ready: banked words first
+        (no network), then looked-up words in the order their lookups finish.
+        """
+        if not self.common_words:
+            return
+        produced = 0
+        to_fetch = []
+        try:
+            for question in self._bank_questions(self._sample_words(num_questions), num_questions, to_fetch):
+                produced += 1
+                yield question
+            if to_fetch and produced < num_questions:
+                yield from self._fetch_questions(to_fetch, num_questions - produced)
+        finally:
+            self._save_word_data()
 
-            q_type = random.choice(['SYNONYM', 'ANTONYM'])
-            
-            # Prioritize the chosen type, but fall back if no options exist
-            if q_type == 'SYNONYM' and synonyms:
-                correct = random.choice(list(synonyms))
-                label = 'synonym'
-            elif antonyms: # This covers ANTONYM choice or SYNONYM fallback
-                correct = random.choice(list(antonyms))
-                label = 'antonym'
-            else:
+    async def create_quiz_async(self, num_questions):
+        """create_quiz for asyncio code (asgi_app.py)."""
+        return [question async for question in self.iter_quiz_async(num_questions)]
+
+    async def iter_quiz_async(self, num_questions):
+        """iter_quiz for asyncio code: lookups run as tasks on the event loop instead of pool threads."""
+        if not self.common_words:
+            return
+        produced = 0
+        to_fetch = []
+        try:
+            for question in self._bank_questions(self._sample_words(num_questions), num_questions, to_fetch):
+                produced += 1
+                yield question
+            if to_fetch and produced < num_questions:
+                async for question in self._fetch_questions_async(to_fetch, num_questions - produced):
+                    yield question
+        finally:
+            self._save_word_data()
+
+    def _sample_words(self, num_questions):
+        """
+        Random candidate words: known-usable ones, plus enough unchecked ones to cover those
+        that turn out dead. Words more users have missed are drawn more often.
+        """
+        return self.quiz_words.sample(num_questions, keep=self.difficulty.sampler())
+
+    def _bank_entry(self, word, data):
+        """Banks a looked-up entry and notes whether the word can make questions. Returns its relations, or None."""
+        if not self.bank.add_entry(word, data):
+            if not_found(word):  # an API answer, not a network error
+                self.quiz_words.mark(word, NOT_FOUND)
+            return None
+        relations = self.bank.get(word)
+        self.quiz_words.mark(word, USABLE if any(relations) else NO_RELATIONS)
+        return relations
+
+    def _save_word_data(self):
+        """Persists what a quiz learned: new bank entries and word statuses."""
+        self.bank.save_if_dirty()
+        if self._quiz_words is not None:
+            self._quiz_words.save_if_dirty()
+
+    def _bank_questions(self, words, num_questions, to_fetch):
+        """
+        Yields up to num_questions questions for banked words, which need no network
+        at all; words that aren't banked yet are appended to to_fetch.
+        """
+        produced = 0
+        for word in words:
+            if produced >= num_questions:
+                return
+            relations = self.bank.get(word)
+            if relations is None:
+                to_fetch.append(word)
                 continue
+            self.quiz_words.mark(word, USABLE if any(relations) else NO_RELATIONS)
+            question = self._build_question(word, *relations)
+            if question:
+                produced += 1
+                QUIZ_QUESTIONS.inc(source='bank')
+                yield question
 
-            # Create options/distractors
-            all_opts = list(synonyms.union(antonyms).union(set(self.common_words)))
-            distractors = [w for w in all_opts if w.lower() != correct.lower() and w.lower() != word.lower()]
-            # Ensure distractors are not duplicates and take up to 3
-            distractors = list(set(distractors))
-            distractors = random.sample(distractors, min(3, len(distractors)))
-            
-            options = distractors + [correct]
-            random.shuffle(options)
-            
-            # Only include words that are distinct options (case-insensitive check)
-            unique_options = []
-            seen = set()
-            for opt in options:
-                if opt.lower() not in seen:
-                    unique_options.append(opt)
-                    seen.add(opt.lower())
-
-            # Only proceed if we have a correct answer and enough options
-            if correct in unique_options and len(unique_options) >= 2:
-                 quiz.append({'word': word, 'label': label, 'correct': correct, 'options': unique_options})
-        
-        print(f"Quiz generated with {len(quiz)} questions.")
-        return quiz
+    def create_review_quiz(self, username, num_questions):
+        """A quiz over the user's missed words that are due for review; may be shorter than asked."""
+        return list(self.iter_review_quiz(username, num_questions))
+
+    def iter_review_quiz(self, username, num_questions):
+        """
+        Yields questions for the user's words that are due for review, most overdue first
+        (nothing if none are due). Relations come
+        from the question bank or the lookup cache; only words found in neither go to
+        the dictionary API.
+        """
+        produced = 0
+        to_fetch = []
+        try:
+            for word in self.reviews.next_words(username, num_questions * 2):
+                if produced >= num_questions:
+                    return
+                relations = self.bank.get(word)
+                if relations is None and self.bank.add_entry(word, cached_lookup(word)):
+                    relations = self.bank.get(word)
+                if relations is None:
+                    to_fetch.append(word)
+                    continue
+                question = self._build_question(word, *relations)
+                if question:
+                    produced += 1
+                    QUIZ_QUESTIONS.inc(source='review')
+                    yield question
+
+            if to_fetch:
+                yield from self._fetch_questions(to_fetch, num_questions - produced)
+        finally:
+            self._save_word_data()
+
+    def _fetch_questions(self, words, num_questions):
+        """Looks words up concurrently, yielding up to num_questions questions as lookups finish."""
+        if num_questions <= 0:
+            return
+        produced = 0
+        pool = ThreadPoolExecutor(max_workers=QUIZ_LOOKUP_WORKERS)
+        futures = {pool.submit(api_lookup, word): word for word in words}
+        try:
+            # Keep whichever answers come back first
+            for future in as_completed(futures, timeout=QUIZ_DEADLINE):
+                word, data = futures[future], future.result()
+                relations = self._bank_entry(word, data)
+                if relations is None:
+                    continue
+                question = self._build_question(word, *relations)
+                if question:
+                    produced += 1
+                    QUIZ_QUESTIONS.inc(source='lookup')
+                    yield question
+                if produced >= num_questions:
+                    break
+        except FuturesTimeout:
+            print(f"⏱️ Quiz deadline of {QUIZ_DEADLINE}s reached, using the questions ready so far.")
+        finally:
+            # Drop lookups that haven't started; running ones finish in the background and still fill the cache
+            pool.shutdown(wait=False, cancel_futures=True)
+            QUIZ_LOOKUPS.inc(sum(1 for f in futures if not f.cancelled()))
+
+    async def _fetch_questions_async(self, words, num_questions):
+        """Async _fetch_questions: up to QUIZ_LOOKUP_WORKERS lookups at a time, same deadline."""
+        if num_questions <= 0:
+            return
+        limit = asyncio.Semaphore(QUIZ_LOOKUP_WORKERS)
+        started = 0
+
+        async def lookup(word):
+            nonlocal started
+            async with limit:
+                started += 1
+                return word, await api_lookup_async(word)
+
+        tasks = [asyncio.ensure_future(lookup(word)) for word in words]
+        produced = 0
+        try:
+            for next_done in asyncio.as_completed(tasks, timeout=QUIZ_DEADLINE):
+                word, data = await next_done
+                relations = self._bank_entry(word, data)
+                if relations is None:
+                    continue
+                question = self._build_question(word, *relations)
+                if question:
+                    produced += 1
+                    QUIZ_QUESTIONS.inc(source='lookup')
+                    yield question
+                if produced >= num_questions:
+                    break
+        except asyncio.TimeoutError:
+            print(f"⏱️ Quiz deadline of {QUIZ_DEADLINE}s reached, using the questions ready so far.")
+        finally:
+            # Lookups already sent keep running in their own task and still fill the cache
+            for task in tasks:
+                task.cancel()
+            QUIZ_LOOKUPS.inc(started)
+
+    def _build_question(self, word, synonyms, antonyms):
+        """Turns a word's synonym/antonym sets into a quiz question dict, or None if the word can't be used."""
+        # Check for sufficient content to make a question
+        if not synonyms and not antonyms:
+            return None
+
+        q_type = random.choice(['SYNONYM', 'ANTONYM'])
+
+        # Prioritize the chosen type, but fall back to the other one if it has no options
+        if synonyms and (q_type == 'SYNONYM' or not antonyms):
+            correct = random.choice(list(synonyms))
+            label = 'synonym'
+        else: # ANTONYM choice, or SYNONYM fallback (antonyms is non-empty here)
+            correct = random.choice(list(antonyms))
+            label = 'antonym'
+
+        # Create options/distractors: up to 3 distinct words from synonyms ∪ antonyms ∪ vocabulary
+        distractors = self.distractors.sample(3, exclude={correct.lower(), word.lower()},
+                                              extra=set(synonyms).union(antonyms))
+
+        options = distractors + [correct]
+        random.shuffle(options)
+
+        # Only include words that are distinct options (case-insensitive check)
+        unique_options = []
+        seen = set()
+        for opt in options:
+            if opt.lower() not in seen:
+                unique_options.append(opt)
+                seen.add(opt.lower())
+
+        # Only proceed if we have a correct answer and enough options
+        if correct in unique_options and len(unique_options) >= 2:
+            return {'word': word, 'label': label, 'correct': correct, 'options': unique_options}
+        return None
 
     def run_quiz(self):
         print("\n--- MCQ Quiz ---")
         for i, num in enumerate(QUIZ_OPTIONS):
             print(f"{i+1}. {num} Questions")
-        choice = input("Enter choice (1/2/3): ").strip()
-        
-        try:
-            num_q = QUIZ_OPTIONS[int(choice) - 1]
-        except (ValueError, IndexError):
-            print("Invalid choice.")
-            return
-            
-        quiz = self.create_quiz(num_q)
+        print(f"{len(QUIZ_OPTIONS)+1}. Review Missed Words")
+        choice = input(f"Enter choice (1-{len(QUIZ_OPTIONS)+1}): ").strip()
+
+        if choice == str(len(QUIZ_OPTIONS) + 1):
+            quiz = self.create_review_quiz(self.current_user, QUIZ_OPTIONS[0])
+            if not quiz:
+                print("No words are due for review right now.")
+        else:
+            try:
+                num_q = QUIZ_OPTIONS[int(choice) - 1]
+            except (ValueError, IndexError):
+                print("Invalid choice.")
+                return
+            quiz = self.create_quiz(num_q)
         if not quiz:
             return
             
         score = 0
-        wrong = defaultdict(int)
-        
+        answers = []
+
         for i, q in enumerate(quiz):
             print(f"\nQ{i+1}: What is the {q['label']} of '{q['word'].upper()}'?")
             opt_map = {}
@@ -146,49 +437,46 @@ class VocabularyBot:
             if ans in opt_map and opt_map[ans].lower() == q['correct'].lower():
                 print("Correct! +5 points")
                 score += 5
+                answers.append((q['word'].lower(), True))
             else:
                 print(f"Incorrect. The correct answer was: {q['correct']}")
                 score -= 1
-                wrong[q['word']] += 1
-                
-        user = self.users[self.current_user]
-        user['score'] += score
-        
-        # Update incorrect word counts
-        for w, c in wrong.items():
-            user['incorrect_words'][w] = user['incorrect_words'].get(w, 0) + c
-            
-        save_users(self.users) # Use imported save_users
+                answers.append((q['word'].lower(), False))
+
+        # Same path as the web quiz: journal, leaderboard, reviews and difficulty stats
+        user, _ = self.record_answers(self.current_user, answers)
         print(f"\n🎯 Quiz complete! You scored {score} points. Total: {user['score']}")
 
     # --- Lookup ---
-    def display_lookup_menu(self, word=None):
+    def lookup(self, word):
+        """Looks a word up and returns a LookupResult, or None if it wasn't found (or the API is unreachable)."""
+        word = (word or '').strip()
         if not word:
             return None
-
         data = api_lookup(word)
         if not data:
             return None
+        self.suggestions.add(word)
+        return LookupResult.from_entry(word, data, fetched_at=entry_time(word))
 
-        meanings = data.get('meanings', [])
-        result = [f"--- {word.upper()} ---"]
-
-        # Gather meanings
-        for m in meanings:
-            pos = m.get('partOfSpeech', '')
-            defs = m.get('definitions', [])
-            if defs:
-                result.append(f"({pos}) {defs[0].get('definition', 'No definition available')}")
-
-        # Collect synonyms & antonyms
-        syns = set(s for m in meanings for s in m.get('synonyms', []))
-        ants = set(a for m in meanings for a in m.get('antonyms', []))
-
-        result.append("\nSynonyms: " + (', '.join(list(syns)[:10]) or "None"))
-        result.append("Antonyms: " + (', '.join(list(ants)[:10]) or "None"))
+    async def lookup_async(self, word):
+        """lookup for asyncio code (asgi_app.py)."""
+        word = (word or '').strip()
+        if not word:
+            return None
+        data = await api_lookup_async(word)
+        if not data:
+            return None
+        self.suggestions.add(word)
+        fetched_at = await asyncio.to_thread(entry_time, word)  # a cache store query
+        return LookupResult.from_entry(word, data, fetched_at=fetched_at)
 
-        # ✅ Return as a single string (Flask will use this)
-        return "\n".join(result)
+    def display_lookup_menu(self, word=None):
+        """The lookup as a text block for the CLI, or None."""
+        if not word:
+            return None
+        result = self.lookup(word)
+        return result.format() if result else None
 
 
     # --- Feedback & Leaderboard ---
@@ -203,16 +491,29 @@ class VocabularyBot:
         for w, c in sorted(wrong.items(), key=lambda x: x[1], reverse=True)[:5]:
             print(f"{w} (missed {c} times)")
 
+        hardest = self.difficulty.hardest(5)
+        if hardest:
+            print("\n--- Hardest Words Overall ---")
+            for h in hardest:
+                print(f"{h['word']} (missed by {h['miss_rate']:.1%} of learners)")
+
 
     def display_leaderboard(self):
         print("\n--- Leaderboard ---")
-        # Create a list of (username, score) tuples and sort by score
-        ranks = sorted(((u, d['score']) for u, d in self.users.items()), key=lambda x: x[1], reverse=True)
+        ranks = self.leaderboard.top(10)
         
-        for i, (u, s) in enumerate(ranks[:10], 1):
+        for i, u, s in ranks:
             mark = "(YOU)" if u == self.current_user else ""
             print(f"{i}. {u} {mark} - {s} pts")
 
+        # Show where the current user stands if they're outside the top 10
+        my_rank = self.leaderboard.rank(self.current_user)
+        if my_rank and my_rank > len(ranks):
+            print("...")
+            for i, u, s in self.leaderboard.around(self.current_user, radius=1):
+                mark = "(YOU)" if u == self.current_user else ""
+                print(f"{i}. {u} {mark} - {s} pts")
+
     # --- Main Menu ---
     def main_menu(self):
         while True:
@@ -234,7 +535,7 @@ class VocabularyBot:
             elif choice == '4':
                 self.display_leaderboard()
             elif choice == '5':
-                save_users(self.users) # Use imported save_users
+                self.save()
                 print("Goodbye!")
                 break
             else: